@@ -0,0 +1,234 @@
+import argparse
+import re
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from cdecl.footprint import footprint
+from cdecl.parse import (
+    ErrorReporter,
+    PreProcessor,
+    _gil_enabled,
+    _parse_tokens,
+    _tokenise,
+    parse_decls,
+    parse_many,
+)
+
+
+def gen_header(n_decls: int) -> str:
+    lines = [
+        "#define LEN 4",
+        "typedef int (*cb_t)(void *ctx, size_t n);",
+    ]
+    for i in range(n_decls // 4):
+        lines.append(f"int func_{i}(cb_t cb, const char *name, size_t len);")
+        lines.append(f"unsigned long arr_{i}[LEN]; /* array */")
+        lines.append(f"int (*(*fp_{i})(double d))[3];")
+        lines.append(f"cb_t cb_{i};")
+    return "\n".join(lines) + "\n"
+
+
+def legacy_pre_process(content: str) -> str:
+    content = re.sub(
+        r"\[\s*(?:/\*)*\s*([a-zA-Z0-9_]+)\s*(?:\*/)*\s*\]", r"[\1]", content
+    )
+    content = re.sub(r"/\*.*?\*/", "", content, flags=re.S)
+    content = re.sub(r"//.*$", "", content, flags=re.M)
+    content = re.sub(r"(?:typedef)\s*enum.*?{.*?}.*?;", "", content, flags=re.S)
+    pattern = re.compile(
+        r"#define\s+([a-zA-Z0-9_]+)\s+([(]*[0-9]+[x0-9 */+-<>|&%=()]*)\s*"
+    )
+    match = pattern.search(content)
+    while match:
+        content = re.sub(re.escape(match.group(0)), "", content)
+        content = re.sub(match.group(1), match.group(2), content)
+        match = pattern.search(content)
+    content = re.sub(r"^\s*#.*$", "", content, flags=re.M)
+    content = re.sub(r'^\s*extern "C".*$', "", content, flags=re.M)
+    content = re.sub(r"^}\s*$", "", content, flags=re.M)
+    content = re.sub(r"\s+$", "", content, flags=re.M)
+    return content
+
+
+def stages(content: str) -> list[tuple[str, Callable[[Any], Any]]]:
+    err_rep = ErrorReporter(content)
+
+    def pre_process(_):
+        pre_processed, source_map = PreProcessor(content)()
+        err_rep.source_map = source_map
+        return pre_processed
+
+    return [
+        ("pre_process", pre_process),
+        ("tokenise", lambda pre_processed: _tokenise(pre_processed, err_rep)),
+        ("parse", lambda tokens: _parse_tokens(tokens, err_rep)),
+    ]
+
+
+def bench_time(content: str, repeat: int):
+    for name, _ in stages(content):
+        print(f"{name:>12}", end="")
+    print(f"{'total':>12}")
+    for _ in range(repeat):
+        total = 0.0
+        result = None
+        for _, stage in stages(content):
+            start = time.perf_counter()
+            result = stage(result)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            print(f"{elapsed:>11.3f}s", end="")
+        print(f"{total:>11.3f}s")
+
+
+def bench_memory(content: str, n_decls: int) -> float:
+    print(f"{'stage':>12}{'peak':>14}{'retained':>14}{'per decl':>12}")
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    results = [None]
+    for name, stage in stages(content):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        results.append(stage(results[-1]))
+        after, peak = tracemalloc.get_traced_memory()
+        retained = after - before
+        print(
+            f"{name:>12}{peak - before:>14,}{retained:>14,}"
+            f"{retained / n_decls:>12.1f}"
+        )
+    decls = results[-1]
+    del results
+    retained = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    print(f"{'result':>12}{'':>14}{retained:>14,}{retained / n_decls:>12.1f}")
+    print(footprint(decls))
+    return retained / n_decls
+
+
+def bench_pre_process(content: str, repeat: int) -> float:
+    legacy = best_of(repeat, lambda: legacy_pre_process(content))
+    elapsed = best_of(repeat, lambda: PreProcessor(content)())
+    print(f"{'legacy':>12}{legacy:>11.3f}s")
+    print(f"{'pre_process':>12}{elapsed:>11.3f}s{elapsed / legacy:>11.2f}x")
+    return elapsed / legacy
+
+
+def split_header(content: str, n_inputs: int) -> list[str]:
+    lines = content.splitlines(keepends=True)
+    prelude, body = lines[:2], lines[2:]
+    return ["".join(prelude + body[i::n_inputs]) for i in range(n_inputs)]
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_batch(content: str, repeat: int) -> float:
+    n_inputs = len(content.splitlines()) - 2
+    decl_strs = split_header(content, n_inputs)
+    single = best_of(repeat, lambda: [parse_decls([s]) for s in decl_strs])
+    batch = best_of(repeat, lambda: parse_decls(decl_strs))
+    print(f"{'inputs':>12}{n_inputs:>12}")
+    print(f"{'one by one':>12}{single:>11.3f}s")
+    print(f"{'batch':>12}{batch:>11.3f}s{single / batch:>11.2f}x")
+    return single / batch
+
+
+def bench_threads(content: str, repeat: int, n_inputs: int, thread_counts: list[int]):
+    decl_strs = split_header(content, n_inputs)
+    print(f"GIL enabled: {_gil_enabled()}")
+    baseline = best_of(repeat, lambda: parse_decls(decl_strs))
+    print(f"{'threads':>12}{'time':>12}{'speedup':>12}")
+    print(f"{'parse_decls':>12}{baseline:>11.3f}s{1.0:>11.2f}x")
+    for n_threads in thread_counts:
+        with ThreadPoolExecutor(n_threads) as pool:
+            elapsed = best_of(repeat, lambda: parse_many(decl_strs, pool))
+        print(f"{n_threads:>12}{elapsed:>11.3f}s{baseline / elapsed:>11.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Benchmark parsing of a generated header.",
+    )
+    parser.add_argument(
+        "--mode",
+        type=str,
+        choices=["time", "memory", "threads", "pre_process", "batch"],
+        default="time",
+        help="Whether to measure run time or memory use per stage, parse_many "
+        "scaling with thread count, pre_process against the legacy re.sub path, "
+        "or batched parse_decls against parsing many one-declaration inputs on "
+        "their own.",
+    )
+    parser.add_argument(
+        "--decls",
+        type=int,
+        default=100000,
+        help="The number of declarations in the generated header.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="The number of timing runs.",
+    )
+    parser.add_argument(
+        "--max-bytes-per-decl",
+        type=float,
+        default=None,
+        help="Fail if the parse result retains more than this many bytes per decl.",
+    )
+    parser.add_argument(
+        "--max-pre-process-ratio",
+        type=float,
+        default=1.0,
+        help="Fail if pre_process takes longer than this multiple of the legacy path.",
+    )
+    parser.add_argument(
+        "--inputs",
+        type=int,
+        default=64,
+        help="The number of inputs the header is split into in threads mode. "
+        "Batch mode gives each declaration its own input.",
+    )
+    parser.add_argument(
+        "--threads",
+        type=lambda s: [int(n) for n in s.split(",")],
+        default=[1, 2, 4, 8],
+        help="Comma separated thread counts to run in threads mode.",
+    )
+    args = parser.parse_args()
+    content = gen_header(args.decls)
+    if args.mode == "memory":
+        per_decl = bench_memory(content, args.decls)
+        if args.max_bytes_per_decl is not None and per_decl > args.max_bytes_per_decl:
+            sys.exit(
+                f"retained {per_decl:.1f} bytes per decl, "
+                f"budget is {args.max_bytes_per_decl:.1f}"
+            )
+    elif args.mode == "pre_process":
+        ratio = bench_pre_process(content, args.repeat)
+        if ratio > args.max_pre_process_ratio:
+            sys.exit(
+                f"pre_process took {ratio:.2f}x the legacy path, "
+                f"budget is {args.max_pre_process_ratio:.2f}x"
+            )
+    elif args.mode == "threads":
+        bench_threads(content, args.repeat, args.inputs, args.threads)
+    elif args.mode == "batch":
+        bench_batch(content, args.repeat)
+    else:
+        bench_time(content, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,46 @@
 import argparse
+import sys
 
+from cdecl.diff import diff_decls, parse_header_dir
 from cdecl.parse import parse_decls
-from cdecl.print import print_decls
+from cdecl.print import (
+    print_c_decls,
+    print_decls,
+    print_diff,
+    print_explanations,
+    print_file_diff,
+    print_symbols,
+)
+from cdecl.symbols import scan_symbols
+from cdecl.watch import watch
+
+
+def diff_main(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="cdecl diff",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Diff the declarations of two header trees.",
+    )
+    parser.add_argument(
+        "old_dir",
+        type=str,
+        help="The directory containing the old headers.",
+    )
+    parser.add_argument(
+        "new_dir",
+        type=str,
+        help="The directory containing the new headers.",
+    )
+    args = parser.parse_args(argv)
+    diff = diff_decls(parse_header_dir(args.old_dir), parse_header_dir(args.new_dir))
+    print_diff(diff)
 
 
 def main():
+    if sys.argv[1:2] == ["diff"]:
+        diff_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description="Parse c declarations.",
@@ -13,9 +49,54 @@ def main():
         "decl_strs",
         type=str,
         help="A list of c declarations to be parsed.",
-        nargs="+",
+        nargs="*",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["repr", "c"],
+        default="repr",
+        help="The output format of the parsed declarations.",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Explain the parsed declarations in English.",
+    )
+    parser.add_argument(
+        "--symbols",
+        action="store_true",
+        help="Only list the declared names and what kind of symbol each is.",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        metavar="DIR",
+        help="Watch a header tree and report declaration changes as they happen.",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="The number of seconds between polls in watch mode.",
     )
     args = parser.parse_args()
+    if args.watch is not None:
+        try:
+            watch(args.watch, print_file_diff, args.interval)
+        except KeyboardInterrupt:
+            pass
+        return
+    if not args.decl_strs:
+        parser.error("the following arguments are required: decl_strs")
     decl_strs = args.decl_strs
+    if args.symbols:
+        print_symbols(scan_symbols(decl_strs))
+        return
     decls = parse_decls(decl_strs)
-    print_decls(decls)
+    if args.explain:
+        print_explanations(decls)
+    elif args.format == "c":
+        print_c_decls(decls)
+    else:
+        print_decls(decls)
@@ -0,0 +1,172 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+from cdecl.include import IncludeSession
+from cdecl.parse import Type
+
+
+_HEADER_EXTS = (".h", ".hh", ".hpp", ".hxx")
+
+
+@dataclass
+class DeclDiff:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: dict[str, list[str]] = field(default_factory=dict)
+
+
+def _node_id(ty: Type) -> int:
+    return id(ty) if ty.members is None else id(ty.members)
+
+
+class StructuralHasher:
+    def __init__(self):
+        self.memo: dict[int, tuple[Type, int]] = {}
+        self.active: dict[int, int] = {}
+
+    def __call__(self, ty: Type) -> int:
+        return self.hash(ty)
+
+    def hash(self, ty: Type) -> int:
+        return self.hash_node(ty)[0]
+
+    def hash_node(self, ty: Type) -> tuple[int, int]:
+        memoised = self.memo.get(id(ty))
+        if memoised is not None:
+            return memoised[1], len(self.active)
+        depth = self.active.get(id(ty))
+        if depth is not None:
+            return hash((ty.kind, ty.tag)), depth
+
+        depth = len(self.active)
+        self.active[id(ty)] = depth
+        low = depth
+
+        def child(child_ty: Type) -> int:
+            nonlocal low
+            h, child_low = self.hash_node(child_ty)
+            low = min(low, child_low)
+            return h
+
+        try:
+            h = hash(
+                (
+                    ty.kind,
+                    None if ty.base is None else child(ty.base),
+                    None if ty.ret_ty is None else child(ty.ret_ty),
+                    (
+                        None
+                        if ty.params is None
+                        else tuple(child(param_ty) for param_ty, _ in ty.params)
+                    ),
+                    ty.array_len,
+                    (
+                        None
+                        if ty.members is None
+                        else tuple(
+                            (child(member_ty), name, bit_width)
+                            for member_ty, name, bit_width in ty.members
+                        )
+                    ),
+                    ty.tag,
+                )
+            )
+        finally:
+            del self.active[id(ty)]
+        if low >= depth:
+            self.memo[id(ty)] = (ty, h)
+        return h, low
+
+    def diff_paths(
+        self,
+        old: Type,
+        new: Type,
+        path: str = "",
+        ancestors: Optional[set[tuple[int, int]]] = None,
+    ) -> list[str]:
+        if ancestors is None:
+            ancestors = set()
+        key = (_node_id(old), _node_id(new))
+        if key in ancestors or self.hash(old) == self.hash(new):
+            return []
+
+        n_old_params = None if old.params is None else len(old.params)
+        n_new_params = None if new.params is None else len(new.params)
+        n_old_members = None if old.members is None else len(old.members)
+        n_new_members = None if new.members is None else len(new.members)
+        if (
+            old.kind != new.kind
+            or old.array_len != new.array_len
+            or old.tag != new.tag
+            or n_old_params != n_new_params
+            or n_old_members != n_new_members
+        ):
+            return [path or "."]
+
+        ancestors.add(key)
+        paths = []
+        for attr in ("base", "ret_ty"):
+            old_child = getattr(old, attr)
+            new_child = getattr(new, attr)
+            if old_child is None or new_child is None:
+                if old_child is not new_child:
+                    paths.append(f"{path}.{attr}")
+                continue
+            paths += self.diff_paths(old_child, new_child, f"{path}.{attr}", ancestors)
+        if old.params is not None and new.params is not None:
+            for i, ((old_param, _), (new_param, _)) in enumerate(
+                zip(old.params, new.params)
+            ):
+                paths += self.diff_paths(
+                    old_param, new_param, f"{path}.params[{i}]", ancestors
+                )
+        if old.members is not None and new.members is not None:
+            for i, (old_member, new_member) in enumerate(zip(old.members, new.members)):
+                member_path = f"{path}.members[{i}]"
+                if old_member[1:] != new_member[1:]:
+                    paths.append(member_path)
+                else:
+                    paths += self.diff_paths(
+                        old_member[0], new_member[0], member_path, ancestors
+                    )
+        ancestors.discard(key)
+        return paths
+
+
+def diff_decls(
+    old: dict[str, Type],
+    new: dict[str, Type],
+    hasher: Optional[StructuralHasher] = None,
+) -> DeclDiff:
+    if hasher is None:
+        hasher = StructuralHasher()
+    diff = DeclDiff()
+    for name, old_ty in old.items():
+        new_ty = new.get(name)
+        if new_ty is None:
+            diff.removed.append(name)
+        elif hasher(old_ty) != hasher(new_ty):
+            diff.changed[name] = hasher.diff_paths(old_ty, new_ty)
+    for name in new:
+        if name not in old:
+            diff.added.append(name)
+    return diff
+
+
+def header_paths(root: str) -> list[str]:
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(_HEADER_EXTS):
+                paths.append(os.path.join(dir_path, file_name))
+    return paths
+
+
+def parse_header_dir(root: str) -> dict[str, Type]:
+    session = IncludeSession([root])
+    decls = {}
+    for path in header_paths(root):
+        decls |= session.parse_file(path)
+    return decls
@@ -0,0 +1,48 @@
+import sys
+from dataclasses import dataclass
+
+from cdecl.parse import Type
+
+
+@dataclass
+class Footprint:
+    decls: int = 0
+    nodes: int = 0
+    unique_nodes: int = 0
+    shared_nodes: int = 0
+    nbytes: int = 0
+
+
+def footprint(decls: dict[str, Type]) -> Footprint:
+    fp = Footprint(decls=len(decls), nbytes=sys.getsizeof(decls))
+    refs: dict[int, int] = {}
+    stack = list(decls.values())
+    while stack:
+        ty = stack.pop()
+        fp.nodes += 1
+        n_refs = refs.get(id(ty), 0)
+        refs[id(ty)] = n_refs + 1
+        if n_refs:
+            if n_refs == 1:
+                fp.shared_nodes += 1
+            continue
+
+        fp.unique_nodes += 1
+        fp.nbytes += sys.getsizeof(ty)
+        if ty.base is not None:
+            stack.append(ty.base)
+        if ty.ret_ty is not None:
+            stack.append(ty.ret_ty)
+        if ty.aliased is not None:
+            stack.append(ty.aliased)
+        if ty.params is not None:
+            fp.nbytes += sys.getsizeof(ty.params)
+            for param in ty.params:
+                fp.nbytes += sys.getsizeof(param)
+                stack.append(param[0])
+        if ty.members is not None:
+            fp.nbytes += sys.getsizeof(ty.members)
+            for member in ty.members:
+                fp.nbytes += sys.getsizeof(member)
+                stack.append(member[0])
+    return fp
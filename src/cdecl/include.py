@@ -0,0 +1,179 @@
+import mmap
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from cdecl.parse import (
+    BytesErrorReporter,
+    BytesPreProcessor,
+    Limits,
+    Macros,
+    Parser,
+    Type,
+    _check_limit,
+    _parse_chunks,
+)
+
+
+_INCLUDE_RE = re.compile(r'#\s*include\s*(?:"([^"\n]+)"|<([^>\n]+)>)')
+_PRAGMA_ONCE_RE = re.compile(r"#\s*pragma\s+once\b")
+_B_GUARD_RE = re.compile(
+    rb"(?:\s|/\*.*?\*/|//[^\n]*)*#[ \t]*ifndef[ \t]+(\w+)[^\n]*\n"
+    rb"(?:\s|/\*.*?\*/|//[^\n]*)*#[ \t]*define[ \t]+(\w+)",
+    re.S,
+)
+_B_GUARD_END_RE = re.compile(rb"#[ \t]*endif\b[^\n]*\s*\Z")
+_GUARD_TAIL = 256
+
+
+@dataclass
+class Header:
+    path: str
+    guarded: bool = False
+    typedefs: dict[str, Type] = field(default_factory=dict)
+    decls: dict[str, Type] = field(default_factory=dict)
+    own_decls: dict[str, Type] = field(default_factory=dict)
+    macros: Macros = field(default_factory=dict)
+    tags: dict[str, Type] = field(default_factory=dict)
+    once: set[str] = field(default_factory=set)
+    includes: set[str] = field(default_factory=set)
+
+
+def _has_include_guard(content: Union[bytes, mmap.mmap]) -> bool:
+    match = _B_GUARD_RE.match(content)
+    if match is None or match.group(1) != match.group(2):
+        return False
+    tail = content[max(0, len(content) - _GUARD_TAIL) :]
+    return _B_GUARD_END_RE.search(tail) is not None
+
+
+class HeaderParser:
+    def __init__(self, session: "IncludeSession", path: str):
+        self.session = session
+        self.header = Header(path, macros=dict(session.defines))
+
+    def __call__(self) -> Header:
+        return self.parse()
+
+    def directive(self, directive: str) -> bool:
+        match = _INCLUDE_RE.match(directive)
+        if match is not None:
+            quoted = match.group(1) is not None
+            self.include(match.group(1) if quoted else match.group(2), quoted)
+            return True
+        if _PRAGMA_ONCE_RE.match(directive):
+            self.header.guarded = True
+            return True
+        return False
+
+    def include(self, name: str, quoted: bool):
+        path = self.session.resolve(name, os.path.dirname(self.header.path), quoted)
+        if path is None:
+            return
+        self.header.includes.add(path)
+        if path in self.header.once:
+            return
+        included = self.session.header(path)
+        if included is None:
+            return
+        self.header.once |= included.once
+        self.header.macros |= included.macros
+        self.header.typedefs |= included.typedefs
+        self.header.tags |= included.tags
+        self.header.decls |= included.decls
+
+    def parse_buffer(self, content: Union[bytes, mmap.mmap]):
+        limits = self.session.limits
+        if _has_include_guard(content):
+            self.header.guarded = True
+        try:
+            pre_processor = BytesPreProcessor(
+                content, self.header.macros, limits, self.directive
+            )
+            err_rep = BytesErrorReporter(content, pre_processor.source_map)
+            parser = Parser(
+                [], err_rep, limits, None if limits is None else limits.deadline()
+            )
+            parser.typedefs = self.header.typedefs
+            parser.tags = self.header.tags
+            self.header.own_decls = _parse_chunks(pre_processor, parser)
+            self.header.decls |= self.header.own_decls
+        except RuntimeError as e:
+            print(e)
+
+    def parse(self) -> Header:
+        with open(self.header.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.session.limits is not None:
+                _check_limit("input size", size, self.session.limits.max_input_size)
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    self.parse_buffer(content)
+        if self.header.guarded:
+            self.header.once.add(self.header.path)
+        return self.header
+
+
+class IncludeSession:
+    def __init__(
+        self,
+        include_paths: Optional[list[str]] = None,
+        limits: Optional[Limits] = None,
+        defines: Optional[Macros] = None,
+    ):
+        self.include_paths = [os.path.abspath(path) for path in include_paths or []]
+        self.limits = limits
+        self.defines: Macros = {} if defines is None else defines
+        self.headers: dict[str, Header] = {}
+        self.parsing: set[str] = set()
+
+    def resolve(self, name: str, from_dir: str, quoted: bool) -> Optional[str]:
+        dirs = [from_dir] + self.include_paths if quoted else self.include_paths
+        for dir_path in dirs:
+            path = os.path.join(dir_path, name)
+            if os.path.isfile(path):
+                return os.path.realpath(path)
+        return None
+
+    def header(self, path: str) -> Optional[Header]:
+        header = self.headers.get(path)
+        if header is not None or path in self.parsing:
+            return header
+        self.parsing.add(path)
+        try:
+            header = HeaderParser(self, path)()
+        finally:
+            self.parsing.discard(path)
+        self.headers[path] = header
+        return header
+
+    def invalidate(self, path: str) -> set[str]:
+        stale = {path}
+        found = True
+        while found:
+            found = False
+            for header_path, header in self.headers.items():
+                if header_path not in stale and not header.includes.isdisjoint(stale):
+                    stale.add(header_path)
+                    found = True
+        for header_path in stale:
+            self.headers.pop(header_path, None)
+        return stale
+
+    def parse_file(self, path: str) -> dict[str, Type]:
+        header = self.header(os.path.realpath(path))
+        assert header is not None
+        return dict(header.decls)
+
+
+def parse_files(
+    paths: list[str],
+    include_paths: Optional[list[str]] = None,
+    defines: Optional[Macros] = None,
+) -> dict[str, Type]:
+    session = IncludeSession(include_paths, defines=defines)
+    decls = {}
+    for path in paths:
+        decls |= session.parse_file(path)
+    return decls
@@ -0,0 +1,166 @@
+import weakref
+from collections import defaultdict
+from typing import Any, Hashable, Optional
+
+from cdecl.parse import Type, TypeKind
+
+
+Memo = dict[int, tuple[weakref.ref, Any]]
+
+
+def _remember(memo: Memo, ty: Type, value: Any):
+    key = id(ty)
+    memo[key] = (weakref.ref(ty, lambda _: memo.pop(key, None)), value)
+
+
+def type_key(ty: Type, memo: Optional[Memo] = None) -> Hashable:
+    if ty.typedef_name is not None:
+        return ty.typedef_name
+    if ty.tag is not None:
+        return ty.kind, ty.tag
+    if memo is not None and id(ty) in memo:
+        return memo[id(ty)][1]
+
+    key = (
+        ty.kind,
+        None if ty.base is None else type_key(ty.base, memo),
+        None if ty.ret_ty is None else type_key(ty.ret_ty, memo),
+        (
+            None
+            if ty.params is None
+            else tuple(type_key(param_ty, memo) for param_ty, _ in ty.params)
+        ),
+        ty.array_len,
+        (
+            None
+            if ty.members is None
+            else tuple(
+                (type_key(member_ty, memo), name, bit_width)
+                for member_ty, name, bit_width in ty.members
+            )
+        ),
+        ty.tag,
+    )
+    if memo is not None:
+        _remember(memo, ty, key)
+    return key
+
+
+def _kind_chain(ty: Type) -> tuple[TypeKind, ...]:
+    kinds = [ty.kind]
+    while ty.base is not None:
+        ty = ty.base
+        kinds.append(ty.kind)
+    return tuple(kinds)
+
+
+class DeclIndex:
+    def __init__(self, decls: Optional[dict[str, Type]] = None):
+        self.decls: dict[str, Type] = {}
+        self.by_typedef: dict[str, set[str]] = defaultdict(set)
+        self.by_kind: dict[TypeKind, set[str]] = defaultdict(set)
+        self.by_param: dict[Hashable, set[str]] = defaultdict(set)
+        self.by_ret: dict[Hashable, set[str]] = defaultdict(set)
+        self.by_ret_kind: dict[tuple[TypeKind, ...], set[str]] = defaultdict(set)
+        self._postings: dict[str, list[tuple[dict, Hashable]]] = {}
+        self._key_memo: Memo = {}
+        self._typedef_memo: Memo = {}
+        if decls is not None:
+            self.update(decls)
+
+    def __len__(self) -> int:
+        return len(self.decls)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.decls
+
+    def typedefs_in(self, ty: Type) -> frozenset[str]:
+        return self._typedefs_in(ty, {})[0]
+
+    def _typedefs_in(
+        self, ty: Type, active: dict[int, int]
+    ) -> tuple[frozenset[str], int]:
+        if id(ty) in self._typedef_memo:
+            return self._typedef_memo[id(ty)][1], len(active)
+        if id(ty) in active:
+            return frozenset(), active[id(ty)]
+
+        depth = len(active)
+        active[id(ty)] = depth
+        low = depth
+        names = set()
+        if ty.typedef_name is not None:
+            names.add(ty.typedef_name)
+        children = [ty.base, ty.ret_ty, ty.aliased]
+        if ty.params is not None:
+            children.extend(param_ty for param_ty, _ in ty.params)
+        if ty.members is not None:
+            children.extend(member_ty for member_ty, _, _ in ty.members)
+        for child in children:
+            if child is not None:
+                child_names, child_low = self._typedefs_in(child, active)
+                names |= child_names
+                low = min(low, child_low)
+        del active[id(ty)]
+
+        typedefs = frozenset(names)
+        if low >= depth:
+            _remember(self._typedef_memo, ty, typedefs)
+        return typedefs, low
+
+    def _post(self, name: str, index: dict, key: Hashable):
+        index[key].add(name)
+        self._postings[name].append((index, key))
+
+    def add(self, name: str, ty: Type):
+        if name in self.decls:
+            self.remove(name)
+        self.decls[name] = ty
+        self._postings[name] = []
+
+        self._post(name, self.by_kind, ty.kind)
+        for typedef_name in self.typedefs_in(ty):
+            self._post(name, self.by_typedef, typedef_name)
+
+        if ty.kind != TypeKind.FUNC:
+            return
+        assert ty.ret_ty is not None
+        self._post(name, self.by_ret, type_key(ty.ret_ty, self._key_memo))
+        chain = _kind_chain(ty.ret_ty)
+        for i in range(1, len(chain) + 1):
+            self._post(name, self.by_ret_kind, chain[:i])
+        for param_ty, _ in ty.params or []:
+            self._post(name, self.by_param, type_key(param_ty, self._key_memo))
+
+    def update(self, decls: dict[str, Type]):
+        for name, ty in decls.items():
+            self.add(name, ty)
+
+    def remove(self, name: str):
+        del self.decls[name]
+        for index, key in self._postings.pop(name):
+            names = index.get(key)
+            if names is None:
+                continue
+            names.discard(name)
+            if not names:
+                del index[key]
+
+    def _lookup(self, index: dict, key: Hashable) -> set[str]:
+        names = index.get(key)
+        return set() if names is None else set(names)
+
+    def of_kind(self, kind: TypeKind) -> set[str]:
+        return self._lookup(self.by_kind, kind)
+
+    def using_typedef(self, typedef_name: str) -> set[str]:
+        return self._lookup(self.by_typedef, typedef_name)
+
+    def taking(self, ty: Type) -> set[str]:
+        return self._lookup(self.by_param, type_key(ty))
+
+    def returning(self, ty: Type) -> set[str]:
+        return self._lookup(self.by_ret, type_key(ty))
+
+    def returning_kind(self, *kinds: TypeKind) -> set[str]:
+        return self._lookup(self.by_ret_kind, kinds)
@@ -0,0 +1,227 @@
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from cdecl.parse import Type, TypeKind
+
+
+_COMMON_SIZES = {
+    TypeKind.BOOL: 1,
+    TypeKind.CHAR: 1,
+    TypeKind.UCHAR: 1,
+    TypeKind.I8: 1,
+    TypeKind.U8: 1,
+    TypeKind.SHORT: 2,
+    TypeKind.USHORT: 2,
+    TypeKind.I16: 2,
+    TypeKind.U16: 2,
+    TypeKind.INT: 4,
+    TypeKind.UINT: 4,
+    TypeKind.I32: 4,
+    TypeKind.U32: 4,
+    TypeKind.FLOAT: 4,
+    TypeKind.LLONG: 8,
+    TypeKind.ULLONG: 8,
+    TypeKind.I64: 8,
+    TypeKind.U64: 8,
+    TypeKind.DOUBLE: 8,
+}
+
+
+@dataclass(frozen=True)
+class Abi:
+    name: str
+    sizes: Mapping[TypeKind, int]
+    aligns: Mapping[TypeKind, int]
+    ms_bitfields: bool = False
+
+
+def _abi(
+    name: str,
+    long_size: int,
+    ptr_size: int,
+    aligns: Optional[dict[TypeKind, int]] = None,
+    ms_bitfields: bool = False,
+) -> Abi:
+    sizes = _COMMON_SIZES | {
+        TypeKind.LONG: long_size,
+        TypeKind.ULONG: long_size,
+        TypeKind.SIZE: ptr_size,
+        TypeKind.SSIZE: ptr_size,
+        TypeKind.PTR: ptr_size,
+    }
+    return Abi(
+        name,
+        MappingProxyType(sizes),
+        MappingProxyType(sizes | (aligns or {})),
+        ms_bitfields,
+    )
+
+
+LP64 = _abi("lp64", 8, 8)
+LLP64 = _abi("llp64", 4, 8, ms_bitfields=True)
+ILP32 = _abi(
+    "ilp32",
+    4,
+    4,
+    {
+        TypeKind.LLONG: 4,
+        TypeKind.ULLONG: 4,
+        TypeKind.I64: 4,
+        TypeKind.U64: 4,
+        TypeKind.DOUBLE: 4,
+    },
+)
+
+
+@dataclass(frozen=True)
+class Field:
+    offset: int
+    ty: Type
+    bit_offset: Optional[int] = None
+    bit_width: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Layout:
+    size: int
+    align: int
+    fields: Mapping[str, Field]
+
+
+_NO_FIELDS: Mapping[str, Field] = MappingProxyType({})
+
+
+def _round_up(n: int, align: int) -> int:
+    return (n + align - 1) // align * align
+
+
+class FieldIndex:
+    def __init__(self, abi: Abi = LP64):
+        self.abi = abi
+        self.memo: dict[int, tuple[Type, Layout]] = {}
+
+    def __call__(self, ty: Type) -> Layout:
+        return self.layout(ty)
+
+    def field(self, ty: Type, name: str) -> Field:
+        return self.layout(ty).fields[name]
+
+    def fields(self, ty: Type) -> Mapping[str, Field]:
+        return self.layout(ty).fields
+
+    def layout(self, ty: Type) -> Layout:
+        size = self.abi.sizes.get(ty.kind)
+        if size is not None:
+            return Layout(size, self.abi.aligns[ty.kind], _NO_FIELDS)
+        cached = self.memo.get(id(ty))
+        if cached is not None:
+            return cached[1]
+
+        if ty.kind == TypeKind.ARR:
+            assert ty.base is not None
+            elem = self.layout(ty.base)
+            n_elems = ty.array_len if isinstance(ty.array_len, int) else 0
+            layout = Layout(elem.size * n_elems, elem.align, _NO_FIELDS)
+        elif ty.kind in (TypeKind.STRUCT, TypeKind.UNION) and self.abi.ms_bitfields:
+            layout = self.ms_aggregate(ty)
+        elif ty.kind in (TypeKind.STRUCT, TypeKind.UNION):
+            layout = self.aggregate(ty)
+        else:
+            raise ValueError(f"{ty.kind.name.lower()} has no size")
+        self.memo[id(ty)] = (ty, layout)
+        return layout
+
+    def members(self, ty: Type) -> list[tuple[Type, Optional[str], Optional[int]]]:
+        if ty.members is None:
+            raise ValueError(f"incomplete type {ty.kind.name.lower()} {ty.tag}")
+        return ty.members
+
+    def place(
+        self, fields: dict[str, Field], ty: Type, name: Optional[str], offset: int
+    ):
+        if name is not None:
+            fields[name] = Field(offset, ty)
+            return
+        for field_name, field in self.layout(ty).fields.items():
+            fields[field_name] = replace(field, offset=field.offset + offset)
+
+    def aggregate(self, ty: Type) -> Layout:
+        members = self.members(ty)
+        is_union = ty.kind == TypeKind.UNION
+        fields: dict[str, Field] = {}
+        size = 0
+        align = 1
+        bit = 0
+        for member_ty, name, bit_width in members:
+            member = self.layout(member_ty)
+            if is_union:
+                bit = 0
+            if bit_width is None:
+                offset = _round_up((bit + 7) // 8, member.align)
+                bit = (offset + member.size) * 8
+                align = max(align, member.align)
+                self.place(fields, member_ty, name, offset)
+            elif bit_width > member.size * 8:
+                raise ValueError(f"width of bitfield '{name}' exceeds its type")
+            elif bit_width == 0:
+                bit = _round_up(bit, member.align * 8)
+            else:
+                unit = bit // (member.align * 8) * member.align
+                if bit + bit_width > (unit + member.size) * 8:
+                    bit = _round_up(bit, member.align * 8)
+                    unit = bit // 8
+                if name is not None:
+                    fields[name] = Field(unit, member_ty, bit - unit * 8, bit_width)
+                    align = max(align, member.align)
+                bit += bit_width
+            size = max(size, (bit + 7) // 8)
+        return Layout(_round_up(size, align), align, MappingProxyType(fields))
+
+    def ms_aggregate(self, ty: Type) -> Layout:
+        members = self.members(ty)
+        is_union = ty.kind == TypeKind.UNION
+        fields: dict[str, Field] = {}
+        size = 0
+        align = 1
+        unit_size = 0
+        remaining = 0
+        for member_ty, name, bit_width in members:
+            member = self.layout(member_ty)
+            if bit_width is not None and bit_width > member.size * 8:
+                raise ValueError(f"width of bitfield '{name}' exceeds its type")
+            if bit_width == 0:
+                if unit_size and not is_union:
+                    size = _round_up(size, member.align)
+                    align = max(align, member.align)
+                elif unit_size:
+                    size = max(size, member.size)
+                unit_size = 0
+                continue
+            if bit_width is not None:
+                if not is_union and unit_size == member.size and bit_width <= remaining:
+                    unit = size - unit_size
+                    if name is not None:
+                        fields[name] = Field(
+                            unit, member_ty, unit_size * 8 - remaining, bit_width
+                        )
+                    remaining -= bit_width
+                    continue
+                unit_size = member.size
+                remaining = member.size * 8 - bit_width
+                if is_union:
+                    size = max(size, member.size)
+                    unit = 0
+                else:
+                    unit = _round_up(size, member.align)
+                    size = unit + member.size
+                    align = max(align, member.align)
+                if name is not None:
+                    fields[name] = Field(unit, member_ty, 0, bit_width)
+                continue
+            unit_size = 0
+            offset = 0 if is_union else _round_up(size, member.align)
+            size = max(size, offset + member.size)
+            align = max(align, member.align)
+            self.place(fields, member_ty, name, offset)
+        return Layout(_round_up(size, align), align, MappingProxyType(fields))
@@ -0,0 +1,231 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+from cdecl.parse import (
+    ErrorReporter,
+    Parser,
+    PreProcessor,
+    Token,
+    TokenKind,
+    Type,
+    _tokenise,
+    _typedef,
+)
+from cdecl.symbols import Stream, _declarations, _text_stream
+
+
+def _index(
+    stream: Stream, tag_defs: list[tuple[str, int, int]], ends: list[int]
+) -> Stream:
+    stmt_idx = 0
+    depth = 0
+    prev = prev2 = None
+    for token in stream:
+        _, s, content_idx = token
+        if s == ";":
+            if not depth:
+                stmt_idx = content_idx + 1
+                ends.append(stmt_idx)
+        elif s == "{":
+            if (
+                prev2 is not None
+                and (prev2[1] == "struct" or prev2[1] == "union")
+                and prev[0] == TokenKind.TK_IDENT
+            ):
+                tag_defs.append((prev[1], stmt_idx, prev2[2]))
+            depth += 1
+        elif s == "}":
+            depth -= 1
+        prev2, prev = prev, token
+        yield token
+
+
+class LazyTypedefs(Mapping):
+    def __init__(self, content: str, err_rep: ErrorReporter):
+        self.content = content
+        self.err_rep = err_rep
+        self.ends: list[int] = []
+        self.entries: dict[str, list[tuple[int, int]]] = {}
+        self.cache: dict[tuple[str, int], Type] = {}
+        self.tag_entries: dict[str, list[tuple[int, int]]] = {}
+        self.tag_defs: set[int] = set()
+        self.tag_cache: dict[int, Type] = {}
+        self.incomplete: dict[int, list[Type]] = {}
+
+    def __getitem__(self, name: str) -> Type:
+        return self.resolve(name, len(self.content) + 1)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def entry(self, name: str, stmt_idx: int) -> Optional[tuple[int, int]]:
+        entries = self.entries.get(name)
+        if entries is None:
+            return None
+        i = bisect_left(entries, (stmt_idx,))
+        return entries[i - 1] if i else None
+
+    def resolve(self, name: str, stmt_idx: int) -> Type:
+        entry = self.entry(name, stmt_idx)
+        if entry is None:
+            raise KeyError(name)
+        ty = self.cache.get((name, entry[0]))
+        if ty is None:
+            base_ty = self.build(entry[0], 1, entry[1])
+            ty = _typedef(base_ty, name)
+            nodes = self.incomplete.get(id(base_ty))
+            if nodes is not None:
+                nodes.append(ty)
+                self.incomplete[id(ty)] = nodes
+            self.cache[(name, entry[0])] = ty
+        return ty
+
+    def tag(self, tag: str, stmt_idx: int) -> Optional[Type]:
+        entries = self.tag_entries.get(tag)
+        if entries is None:
+            return None
+        i = bisect_left(entries, (stmt_idx,))
+        return self.definition(*(entries[i - 1] if i else entries[0]))
+
+    def definition(self, stmt_idx: int, def_idx: int) -> Type:
+        ty = self.tag_cache.get(def_idx)
+        if ty is None:
+            parser = self.parser(stmt_idx, def_idx)
+            parser.idx = self.position(parser.tokens, def_idx)
+            ty = parser.declspec()
+            for node in self.incomplete.pop(id(ty), []):
+                node.members = ty.members
+                self.incomplete.pop(id(node), None)
+        return ty
+
+    def position(self, tokens: list[Token], content_idx: int) -> int:
+        return bisect_left(tokens, content_idx, key=lambda token: token.content_idx)
+
+    def parser(self, stmt_idx: int, def_idx: Optional[int] = None) -> Parser:
+        i = bisect_right(self.ends, stmt_idx)
+        end = self.ends[i] if i < len(self.ends) else len(self.content)
+        tokens = _tokenise(self.content, self.err_rep, stmt_idx, end)
+        parser = Parser(tokens, self.err_rep)
+        parser.typedefs = LazyScope(self, stmt_idx)  # type: ignore[assignment]
+        parser.tags = LazyTags(self, stmt_idx, def_idx)  # type: ignore[assignment]
+        return parser
+
+    def build(self, stmt_idx: int, spec_pos: int, decl_idx: int) -> Type:
+        parser = self.parser(stmt_idx)
+        if (
+            spec_pos < len(parser.tokens)
+            and parser.tokens[spec_pos].content_idx in self.tag_defs
+        ):
+            base_ty = self.definition(stmt_idx, parser.tokens[spec_pos].content_idx)
+        else:
+            parser.idx = spec_pos
+            base_ty = parser.declspec()
+        parser.idx = self.position(parser.tokens, decl_idx)
+        ty, _ = parser.declarator(base_ty, False)
+        return ty
+
+
+class LazyScope(Mapping):
+    def __init__(self, typedefs: LazyTypedefs, stmt_idx: int):
+        self.typedefs = typedefs
+        self.stmt_idx = stmt_idx
+
+    def __getitem__(self, name: str) -> Type:
+        return self.typedefs.resolve(name, self.stmt_idx)
+
+    def __contains__(self, name: object) -> bool:
+        return (
+            isinstance(name, str)
+            and self.typedefs.entry(name, self.stmt_idx) is not None
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self.typedefs if name in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class LazyTags(Mapping):
+    def __init__(self, typedefs: LazyTypedefs, stmt_idx: int, def_idx: Optional[int]):
+        self.typedefs = typedefs
+        self.stmt_idx = stmt_idx
+        self.def_idx = def_idx
+        self.local: dict[str, Type] = {}
+
+    def __getitem__(self, tag: str) -> Type:
+        ty = self.local.get(tag)
+        if ty is None:
+            ty = self.typedefs.tag(tag, self.stmt_idx)
+        if ty is None:
+            raise KeyError(tag)
+        return ty
+
+    def __setitem__(self, tag: str, ty: Type):
+        self.local[tag] = ty
+        if self.def_idx is not None:
+            self.typedefs.tag_cache[self.def_idx] = ty
+            self.typedefs.incomplete[id(ty)] = []
+            self.def_idx = None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.local.keys() | self.typedefs.tag_entries.keys())
+
+    def __len__(self) -> int:
+        return len(self.local.keys() | self.typedefs.tag_entries.keys())
+
+
+class LazyDecls(Mapping):
+    def __init__(self):
+        self.entries: dict[str, tuple[LazyTypedefs, int, int]] = {}
+        self.cache: dict[str, Type] = {}
+
+    def __getitem__(self, name: str) -> Type:
+        ty = self.cache.get(name)
+        if ty is None:
+            typedefs, stmt_idx, decl_idx = self.entries[name]
+            ty = typedefs.build(stmt_idx, 0, decl_idx)
+            self.cache[name] = ty
+        return ty
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add_content(self, content: str, err_rep: ErrorReporter):
+        typedefs = LazyTypedefs(content, err_rep)
+        tag_defs: list[tuple[str, int, int]] = []
+        stream = _index(_text_stream(content, err_rep), tag_defs, typedefs.ends)
+        for stmt_idx, decl_idx, name, _, is_typedef, _ in _declarations(stream):
+            if is_typedef:
+                typedefs.entries.setdefault(name, []).append((stmt_idx, decl_idx))
+            else:
+                self.entries[name] = (typedefs, stmt_idx, decl_idx)
+                self.cache.pop(name, None)
+        for tag, stmt_idx, def_idx in tag_defs:
+            typedefs.tag_entries.setdefault(tag, []).append((stmt_idx, def_idx))
+            typedefs.tag_defs.add(def_idx)
+
+
+def parse_decls_lazy(decl_strs: list[str]) -> LazyDecls:
+    decls = LazyDecls()
+    for decl_str in decl_strs:
+        content, source_map = PreProcessor(decl_str)()
+        err_rep = ErrorReporter(decl_str, source_map)
+        try:
+            decls.add_content(content, err_rep)
+        except RuntimeError as e:
+            print(e)
+    return decls
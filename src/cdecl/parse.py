@@ -1,43 +1,59 @@
+import mmap
+import os
 import re
-from dataclasses import dataclass
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from enum import Enum, auto
-from typing import Optional, Union
-
-
-_TYPENAMES = [
-    "char",
-    "double",
-    "float",
-    "int",
-    "int16_t",
-    "int32_t",
-    "int64_t",
-    "int8_t",
-    "long",
-    "short",
-    "signed",
-    "size_t",
-    "ssize_t",
-    "uint16_t",
-    "uint32_t",
-    "uint64_t",
-    "uint8_t",
-    "unsigned",
-    "void",
-]
-
-_IGNORED_KEYWORDS = [
-    "const",
-    "extern",
-    "inline",
-    "register",
-    "static",
-    "volatile",
-]
-
-_KEYWORDS = [
-    "typedef",
-]
+from types import MappingProxyType
+from typing import Callable, Iterator, Optional, Union
+
+_TYPENAMES = frozenset(
+    [
+        "char",
+        "double",
+        "float",
+        "int",
+        "int16_t",
+        "int32_t",
+        "int64_t",
+        "int8_t",
+        "long",
+        "short",
+        "signed",
+        "size_t",
+        "ssize_t",
+        "uint16_t",
+        "uint32_t",
+        "uint64_t",
+        "uint8_t",
+        "unsigned",
+        "void",
+    ]
+)
+
+_IGNORED_KEYWORDS = frozenset(
+    [
+        "const",
+        "extern",
+        "inline",
+        "register",
+        "static",
+        "volatile",
+    ]
+)
+
+_KEYWORDS = frozenset(
+    [
+        "struct",
+        "typedef",
+        "union",
+    ]
+)
 
 
 class TokenKind(Enum):
@@ -47,7 +63,7 @@ class TokenKind(Enum):
     TK_KEYWORD = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     kind: TokenKind
     string: str
@@ -55,26 +71,144 @@ class Token:
     content_idx: int
 
 
+class SourceMap:
+    def __init__(self):
+        self.out_idxs = array("q")
+        self.src_idxs = array("q")
+
+    def add(self, out_idx: int, src_idx: int):
+        self.out_idxs.append(out_idx)
+        self.src_idxs.append(src_idx)
+
+    def resolve(self, out_idx: int) -> int:
+        i = bisect_right(self.out_idxs, out_idx) - 1
+        if i < 0:
+            return out_idx
+        return self.src_idxs[i] + out_idx - self.out_idxs[i]
+
+
 class ErrorReporter:
-    def __init__(self, content: str):
+    def __init__(self, content: str, source_map: Optional[SourceMap] = None):
         self.content = content
+        self.source_map = source_map
+        self.line_starts: Optional[array] = None
+
+    def line_num_at(self, content_idx: int) -> int:
+        if self.line_starts is None:
+            newline = "\n" if isinstance(self.content, str) else b"\n"
+            self.line_starts = array("q", [0])
+            idx = self.content.find(newline)
+            while idx >= 0:
+                self.line_starts.append(idx + 1)
+                idx = self.content.find(newline, idx + 1)
+        return bisect_right(self.line_starts, content_idx)
+
+    def locate(self, content_idx: int) -> tuple[int, int]:
+        if self.source_map is not None:
+            content_idx = self.source_map.resolve(content_idx)
+        line_num = self.line_num_at(content_idx)
+        assert self.line_starts is not None
+        return line_num, content_idx - self.line_starts[line_num - 1]
+
+    def line_at(self, content_idx: int) -> tuple[str, int]:
+        line_start_idx = self.content.rfind("\n", 0, content_idx) + 1
+        line_end_idx = self.content.find("\n", content_idx)
+        if line_end_idx < 0:
+            line_end_idx = len(self.content)
+        return (
+            self.content[line_start_idx:line_end_idx],
+            content_idx - line_start_idx,
+        )
 
     def report_err(self, line_num: int, content_idx: int, err_msg: str):
-        line_start_idx = content_idx
-        while line_start_idx >= 0 and self.content[line_start_idx] != "\n":
-            line_start_idx -= 1
-        line_start_idx += 1
+        if self.source_map is not None:
+            line_num, _ = self.locate(content_idx)
+            content_idx = self.source_map.resolve(content_idx)
 
-        line_end_idx = content_idx
-        while line_end_idx < len(self.content) and self.content[line_end_idx] != "\n":
-            line_end_idx += 1
-
-        err_line_pos = content_idx - line_start_idx
+        line, err_line_pos = self.line_at(content_idx)
         err_msg = " " * err_line_pos + "^ " + err_msg
 
-        raise RuntimeError(
-            f"Error: {line_num}\n{self.content[line_start_idx:line_end_idx]}\n{err_msg}"
-        )
+        raise RuntimeError(f"Error: {line_num}\n{line}\n{err_msg}")
+
+
+class BytesErrorReporter(ErrorReporter):
+    def __init__(
+        self, content: Union[bytes, mmap.mmap], source_map: Optional[SourceMap] = None
+    ):
+        self.content = content
+        self.source_map = source_map
+        self.line_starts = None
+
+    def locate(self, content_idx: int) -> tuple[int, int]:
+        if self.source_map is not None:
+            content_idx = self.source_map.resolve(content_idx)
+        _, col = self.line_at(content_idx)
+        return self.line_num_at(content_idx), col
+
+    def line_at(self, content_idx: int) -> tuple[str, int]:
+        line_start_idx = self.content.rfind(b"\n", 0, content_idx) + 1
+        line_end_idx = self.content.find(b"\n", content_idx)
+        if line_end_idx < 0:
+            line_end_idx = len(self.content)
+        line = self.content[line_start_idx:line_end_idx].decode(errors="replace")
+        col = len(self.content[line_start_idx:content_idx].decode(errors="replace"))
+        return line, col
+
+
+class BatchErrorReporter(ErrorReporter):
+    def __init__(
+        self,
+        decl_strs: list[str],
+        source_map: SourceMap,
+        src_starts: list[int],
+        out_starts: list[int],
+    ):
+        super().__init__("", source_map)
+        self.decl_strs = decl_strs
+        self.src_starts = src_starts
+        self.out_starts = out_starts
+
+    def reporter(self, content_idx: int) -> tuple[ErrorReporter, int]:
+        assert self.source_map is not None
+        i = bisect_right(self.out_starts, content_idx) - 1
+        src_idx = self.source_map.resolve(content_idx) - self.src_starts[i]
+        return ErrorReporter(self.decl_strs[i]), src_idx
+
+    def locate(self, content_idx: int) -> tuple[int, int]:
+        err_rep, src_idx = self.reporter(content_idx)
+        return err_rep.locate(src_idx)
+
+    def report_err(self, line_num: int, content_idx: int, err_msg: str):
+        err_rep, src_idx = self.reporter(content_idx)
+        line_num, _ = err_rep.locate(src_idx)
+        err_rep.report_err(line_num, src_idx, err_msg)
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Limits:
+    max_input_size: Optional[int] = None
+    max_tokens: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_macros: Optional[int] = None
+    max_macro_size: Optional[int] = None
+    time_budget: Optional[float] = None
+
+    def deadline(self) -> Optional[float]:
+        if self.time_budget is None:
+            return None
+        return time.monotonic() + self.time_budget
+
+
+_NO_LIMITS = Limits()
+
+
+def _check_limit(what: str, value: int, limit: Optional[int]):
+    if limit is not None and value > limit:
+        raise LimitExceeded(f"{what} {value} exceeds limit {limit}")
 
 
 class TypeKind(Enum):
@@ -84,10 +218,12 @@ class TypeKind(Enum):
     SHORT = auto()
     INT = auto()
     LONG = auto()
+    LLONG = auto()
     UCHAR = auto()
     USHORT = auto()
     UINT = auto()
     ULONG = auto()
+    ULLONG = auto()
     FLOAT = auto()
     DOUBLE = auto()
     I8 = auto()
@@ -103,10 +239,39 @@ class TypeKind(Enum):
     PTR = auto()
     ARR = auto()
     FUNC = auto()
+    STRUCT = auto()
+    UNION = auto()
+
+
+_INTEGER_KINDS = frozenset(
+    [
+        TypeKind.BOOL,
+        TypeKind.CHAR,
+        TypeKind.SHORT,
+        TypeKind.INT,
+        TypeKind.LONG,
+        TypeKind.LLONG,
+        TypeKind.UCHAR,
+        TypeKind.USHORT,
+        TypeKind.UINT,
+        TypeKind.ULONG,
+        TypeKind.ULLONG,
+        TypeKind.I8,
+        TypeKind.I16,
+        TypeKind.I32,
+        TypeKind.I64,
+        TypeKind.U8,
+        TypeKind.U16,
+        TypeKind.U32,
+        TypeKind.U64,
+        TypeKind.SIZE,
+        TypeKind.SSIZE,
+    ]
+)
 
 
 class TypeCounter(Enum):
-    CHAR = 0 << 2
+    CHAR = 1 << 2
     SHORT = 1 << 4
     INT = 1 << 6
     LONG = 1 << 8
@@ -121,84 +286,161 @@ class Type:
     ret_ty: Optional["Type"] = None
     params: Optional[list[tuple["Type", Optional[str]]]] = None
     array_len: Optional[Union[int, str]] = None
+    members: Optional[list[tuple["Type", Optional[str], Optional[int]]]] = None
+    tag: Optional[str] = None
+    typedef_name: Optional[str] = field(default=None, compare=False, repr=False)
+    aliased: Optional["Type"] = field(default=None, compare=False, repr=False)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Type):
+            return NotImplemented
+        return _same_type(self, other, set())
+
+
+def _same_type(
+    a: Optional[Type], b: Optional[Type], assumed: set[tuple[int, int]]
+) -> bool:
+    if a is b:
+        return True
+    if a is None or b is None:
+        return False
+    if (id(a), id(b)) in assumed:
+        return True
+    if a.kind != b.kind or a.array_len != b.array_len or a.tag != b.tag:
+        return False
+    assumed.add((id(a), id(b)))
+    if not _same_type(a.base, b.base, assumed):
+        return False
+    if not _same_type(a.ret_ty, b.ret_ty, assumed):
+        return False
+    if (a.params is None) != (b.params is None):
+        return False
+    if a.params is not None and b.params is not None:
+        if len(a.params) != len(b.params):
+            return False
+        for (a_ty, a_name), (b_ty, b_name) in zip(a.params, b.params):
+            if a_name != b_name or not _same_type(a_ty, b_ty, assumed):
+                return False
+    if (a.members is None) != (b.members is None):
+        return False
+    if a.members is not None and b.members is not None:
+        if len(a.members) != len(b.members):
+            return False
+        for (a_ty, *a_rest), (b_ty, *b_rest) in zip(a.members, b.members):
+            if a_rest != b_rest or not _same_type(a_ty, b_ty, assumed):
+                return False
+    return True
+
+
+def _typedef(ty: Type, name: str) -> Type:
+    return replace(
+        ty, typedef_name=name, aliased=None if ty.typedef_name is None else ty
+    )
 
 
 class Parser:
-    _TOK_TO_TYKIND = {
-        "void": TypeKind.VOID,
-        "bool": TypeKind.BOOL,
-        "uint8_t": TypeKind.U8,
-        "uint16_t": TypeKind.U16,
-        "uint32_t": TypeKind.U32,
-        "uint64_t": TypeKind.U64,
-        "int8_t": TypeKind.I8,
-        "int16_t": TypeKind.I16,
-        "int32_t": TypeKind.I32,
-        "int64_t": TypeKind.I64,
-        "float": TypeKind.FLOAT,
-        "double": TypeKind.DOUBLE,
-        "size_t": TypeKind.SIZE,
-        "ssize_t": TypeKind.SSIZE,
-    }
-
-    _TYCNT_TO_TYKIND = {
-        TypeCounter.CHAR.value: TypeKind.CHAR,
-        TypeCounter.CHAR.value + TypeCounter.SIGNED.value: TypeKind.CHAR,
-        TypeCounter.CHAR.value + TypeCounter.UNSIGNED.value: TypeKind.UCHAR,
-        TypeCounter.SHORT.value: TypeKind.SHORT,
-        TypeCounter.SHORT.value + TypeCounter.INT.value: TypeKind.SHORT,
-        TypeCounter.SHORT.value + TypeCounter.SIGNED.value: TypeKind.SHORT,
-        TypeCounter.SHORT.value
-        + TypeCounter.SIGNED.value
-        + TypeCounter.INT.value: TypeKind.SHORT,
-        TypeCounter.SHORT.value + TypeCounter.UNSIGNED.value: TypeKind.USHORT,
-        TypeCounter.SHORT.value
-        + TypeCounter.UNSIGNED.value
-        + TypeCounter.INT.value: TypeKind.USHORT,
-        TypeCounter.INT.value: TypeKind.INT,
-        TypeCounter.SIGNED.value: TypeKind.INT,
-        TypeCounter.INT.value + TypeCounter.SIGNED.value: TypeKind.INT,
-        TypeCounter.UNSIGNED.value: TypeKind.UINT,
-        TypeCounter.INT.value + TypeCounter.UNSIGNED.value: TypeKind.UINT,
-        TypeCounter.LONG.value: TypeKind.LONG,
-        TypeCounter.LONG.value + TypeCounter.INT.value: TypeKind.LONG,
-        TypeCounter.LONG.value + TypeCounter.LONG.value: TypeKind.LONG,
-        TypeCounter.LONG.value
-        + TypeCounter.LONG.value
-        + TypeCounter.INT.value: TypeKind.LONG,
-        TypeCounter.LONG.value + TypeCounter.SIGNED.value: TypeKind.LONG,
-        TypeCounter.LONG.value
-        + TypeCounter.SIGNED.value
-        + TypeCounter.INT.value: TypeKind.LONG,
-        TypeCounter.LONG.value
-        + TypeCounter.SIGNED.value
-        + TypeCounter.LONG.value: TypeKind.LONG,
-        TypeCounter.LONG.value
-        + TypeCounter.SIGNED.value
-        + TypeCounter.LONG.value
-        + TypeCounter.INT.value: TypeKind.LONG,
-        TypeCounter.LONG.value + TypeCounter.UNSIGNED.value: TypeKind.ULONG,
-        TypeCounter.LONG.value
-        + TypeCounter.UNSIGNED.value
-        + TypeCounter.INT.value: TypeKind.ULONG,
-        TypeCounter.LONG.value
-        + TypeCounter.UNSIGNED.value
-        + TypeCounter.LONG.value: TypeKind.ULONG,
-        TypeCounter.LONG.value
-        + TypeCounter.UNSIGNED.value
-        + TypeCounter.LONG.value
-        + TypeCounter.INT.value: TypeKind.ULONG,
-    }
-
-    def __init__(self, tokens: list[Token], err_rep: ErrorReporter):
+    _TOK_TO_TYKIND = MappingProxyType(
+        {
+            "void": TypeKind.VOID,
+            "bool": TypeKind.BOOL,
+            "uint8_t": TypeKind.U8,
+            "uint16_t": TypeKind.U16,
+            "uint32_t": TypeKind.U32,
+            "uint64_t": TypeKind.U64,
+            "int8_t": TypeKind.I8,
+            "int16_t": TypeKind.I16,
+            "int32_t": TypeKind.I32,
+            "int64_t": TypeKind.I64,
+            "float": TypeKind.FLOAT,
+            "double": TypeKind.DOUBLE,
+            "size_t": TypeKind.SIZE,
+            "ssize_t": TypeKind.SSIZE,
+        }
+    )
+
+    _TYCNT_TO_TYKIND = MappingProxyType(
+        {
+            TypeCounter.CHAR.value: TypeKind.CHAR,
+            TypeCounter.CHAR.value + TypeCounter.SIGNED.value: TypeKind.CHAR,
+            TypeCounter.CHAR.value + TypeCounter.UNSIGNED.value: TypeKind.UCHAR,
+            TypeCounter.SHORT.value: TypeKind.SHORT,
+            TypeCounter.SHORT.value + TypeCounter.INT.value: TypeKind.SHORT,
+            TypeCounter.SHORT.value + TypeCounter.SIGNED.value: TypeKind.SHORT,
+            TypeCounter.SHORT.value
+            + TypeCounter.SIGNED.value
+            + TypeCounter.INT.value: TypeKind.SHORT,
+            TypeCounter.SHORT.value + TypeCounter.UNSIGNED.value: TypeKind.USHORT,
+            TypeCounter.SHORT.value
+            + TypeCounter.UNSIGNED.value
+            + TypeCounter.INT.value: TypeKind.USHORT,
+            TypeCounter.INT.value: TypeKind.INT,
+            TypeCounter.SIGNED.value: TypeKind.INT,
+            TypeCounter.INT.value + TypeCounter.SIGNED.value: TypeKind.INT,
+            TypeCounter.UNSIGNED.value: TypeKind.UINT,
+            TypeCounter.INT.value + TypeCounter.UNSIGNED.value: TypeKind.UINT,
+            TypeCounter.LONG.value: TypeKind.LONG,
+            TypeCounter.LONG.value + TypeCounter.INT.value: TypeKind.LONG,
+            TypeCounter.LONG.value + TypeCounter.LONG.value: TypeKind.LLONG,
+            TypeCounter.LONG.value
+            + TypeCounter.LONG.value
+            + TypeCounter.INT.value: TypeKind.LLONG,
+            TypeCounter.LONG.value + TypeCounter.SIGNED.value: TypeKind.LONG,
+            TypeCounter.LONG.value
+            + TypeCounter.SIGNED.value
+            + TypeCounter.INT.value: TypeKind.LONG,
+            TypeCounter.LONG.value
+            + TypeCounter.SIGNED.value
+            + TypeCounter.LONG.value: TypeKind.LLONG,
+            TypeCounter.LONG.value
+            + TypeCounter.SIGNED.value
+            + TypeCounter.LONG.value
+            + TypeCounter.INT.value: TypeKind.LLONG,
+            TypeCounter.LONG.value + TypeCounter.UNSIGNED.value: TypeKind.ULONG,
+            TypeCounter.LONG.value
+            + TypeCounter.UNSIGNED.value
+            + TypeCounter.INT.value: TypeKind.ULONG,
+            TypeCounter.LONG.value
+            + TypeCounter.UNSIGNED.value
+            + TypeCounter.LONG.value: TypeKind.ULLONG,
+            TypeCounter.LONG.value
+            + TypeCounter.UNSIGNED.value
+            + TypeCounter.LONG.value
+            + TypeCounter.INT.value: TypeKind.ULLONG,
+        }
+    )
+
+    def __init__(
+        self,
+        tokens: list[Token],
+        err_rep: ErrorReporter,
+        limits: Optional[Limits] = None,
+        deadline: Optional[float] = None,
+    ):
         self.tokens = tokens
         self.err_rep = err_rep
+        self.limits = _NO_LIMITS if limits is None else limits
+        self.deadline = deadline
+        self.depth = 0
         self.idx = 0
         self.typedefs: dict[str, Type] = {}
+        self.tags: dict[str, Type] = {}
+        self.incomplete: dict[str, list[Type]] = {}
         self.decls: dict[str, Type] = {}
 
     def token(self) -> Token:
-        return self.tokens[self.idx]
+        try:
+            return self.tokens[self.idx]
+        except IndexError:
+            self.report_eof()
+            raise
+
+    def report_eof(self):
+        if self.tokens:
+            token = self.tokens[-1]
+            line_num, content_idx = token.line_num, token.content_idx
+        else:
+            line_num, content_idx = 1, 0
+        self.err_rep.report_err(line_num, content_idx, "unexpected end of input")
 
     def next(self) -> "Parser":
         self.idx += 1
@@ -216,8 +458,9 @@ class Parser:
         return self.parse()
 
     def consume(self, s: str) -> bool:
-        if self.token().kind == TokenKind.TK_RESERVED and self.token().string == s:
-            self.next()
+        token = self.token()
+        if token.string == s and token.kind == TokenKind.TK_RESERVED:
+            self.idx += 1
             return True
         return False
 
@@ -233,8 +476,17 @@ class Parser:
             return True
         return False
 
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LimitExceeded(f"time budget {self.limits.time_budget}s exceeded")
+
+    def enter(self):
+        self.depth += 1
+        _check_limit("nesting depth", self.depth, self.limits.max_depth)
+
     def parse(self) -> dict[str, Type]:
         while not self.is_eof():
+            self.check_deadline()
             is_typedef = self.consume_keyword("typedef")
             ty = self.declspec()
             if is_typedef:
@@ -271,7 +523,8 @@ class Parser:
                     start_tok.line_num, start_tok.content_idx, "typedef name ommitted"
                 )
             assert ident is not None
-            self.typedefs[ident] = ty
+            self.typedefs[ident] = _typedef(ty, ident)
+            self.track_incomplete(ty, self.typedefs[ident])
 
     def pointers(self, ty: Type) -> Type:
         while self.consume("*"):
@@ -292,11 +545,14 @@ class Parser:
         return Type(TypeKind.ARR, basety, None, None, len)
 
     def array_dimensions(self, ty: Type, is_func_param: bool) -> Type:
-        array_len = ""
+        self.enter()
         start_tok = self.token()
+        start_idx = self.idx
         while not self.consume("]"):
-            array_len += self.token().string
             self.next()
+        array_len: Union[int, str] = "".join(
+            token.string for token in self.tokens[start_idx : self.idx - 1]
+        )
         if array_len:
             try:
                 array_len_int = int(array_len)
@@ -312,11 +568,16 @@ class Parser:
         else:
             array_len = 0
         ty = self.type_suffix(ty, is_func_param)
+        self.depth -= 1
         return self.array_of(ty, array_len)
 
     def parse_func_ty(self, ret_ty: Type) -> Type:
         fn = Type(TypeKind.FUNC, None, ret_ty, None)
-        if self.token().string == "void" and self.tokens[self.idx + 1] == ")":
+        if (
+            self.token().string == "void"
+            and self.idx + 1 < len(self.tokens)
+            and self.tokens[self.idx + 1].string == ")"
+        ):
             self.next().next()
             return fn
 
@@ -355,6 +616,7 @@ class Parser:
         return ty
 
     def declarator(self, ty: Type, is_func_param: bool) -> tuple[Type, Optional[str]]:
+        self.enter()
         ty = self.pointers(ty)
         ident = None
         super_ty = None
@@ -394,13 +656,128 @@ class Parser:
                 this_ty.base = ty
             ty = super_ty
 
+        self.depth -= 1
         return ty, ident
 
+    def struct_union_decl(self, kind: TypeKind) -> Type:
+        start_tok = self.token()
+        tag = self.consume_ident()
+        if not self.consume("{"):
+            if tag is None:
+                self.err_rep.report_err(
+                    start_tok.line_num, start_tok.content_idx, "expected tag or '{'"
+                )
+            assert tag is not None
+            ty = self.tags.get(tag)
+            if ty is None:
+                return self.declare_tag(kind, tag)
+            if ty.kind != kind:
+                self.err_rep.report_err(
+                    start_tok.line_num,
+                    start_tok.content_idx,
+                    "tag redeclared as a different kind",
+                )
+            return ty
+
+        if tag is None:
+            return Type(kind, members=self.struct_members())
+        nodes = self.incomplete.get(tag)
+        if nodes is None or nodes[0].kind != kind:
+            ty = self.declare_tag(kind, tag)
+        else:
+            ty = nodes[0]
+        members = self.struct_members()
+        for node in self.incomplete.pop(tag):
+            node.members = members
+        return ty
+
+    def declare_tag(self, kind: TypeKind, tag: str) -> Type:
+        ty = Type(kind, tag=tag)
+        self.tags[tag] = ty
+        self.incomplete[tag] = [ty]
+        return ty
+
+    def track_incomplete(self, ty: Type, alias: Type):
+        nodes = None if ty.tag is None else self.incomplete.get(ty.tag)
+        if nodes is not None and any(node is ty for node in nodes):
+            nodes.append(alias)
+
+    def struct_members(self) -> list[tuple[Type, Optional[str], Optional[int]]]:
+        self.enter()
+        members: list[tuple[Type, Optional[str], Optional[int]]] = []
+        names = set()
+        while not self.consume("}"):
+            start_tok = self.token()
+            base_ty = self.declspec()
+            if self.consume(";"):
+                if base_ty.members is None or base_ty.kind not in (
+                    TypeKind.STRUCT,
+                    TypeKind.UNION,
+                ):
+                    self.err_rep.report_err(
+                        start_tok.line_num,
+                        start_tok.content_idx,
+                        "declaration does not declare anything",
+                    )
+                if base_ty.tag is None:
+                    members.append((base_ty, None, None))
+                continue
+
+            first = True
+            while not self.consume(";"):
+                if not first:
+                    self.expect(",")
+                first = False
+                start_tok = self.token()
+                ty, ident = base_ty, None
+                if self.token().string != ":":
+                    ty, ident = self.declarator(base_ty, False)
+                    if ident is None:
+                        self.err_rep.report_err(
+                            start_tok.line_num,
+                            start_tok.content_idx,
+                            "member name ommitted",
+                        )
+                    if ident in names:
+                        self.err_rep.report_err(
+                            start_tok.line_num,
+                            start_tok.content_idx,
+                            f"duplicate member '{ident}'",
+                        )
+                    names.add(ident)
+                bit_width = self.bit_width(ty) if self.consume(":") else None
+                members.append((ty, ident, bit_width))
+        self.depth -= 1
+        return members
+
+    def bit_width(self, ty: Type) -> int:
+        token = self.token()
+        if ty.kind not in _INTEGER_KINDS:
+            self.err_rep.report_err(
+                token.line_num, token.content_idx, "bitfield must have integer type"
+            )
+        try:
+            bit_width = int(token.string)
+        except ValueError:
+            self.err_rep.report_err(
+                token.line_num,
+                token.content_idx,
+                "bitfield width must be an integer literal",
+            )
+        self.next()
+        return bit_width
+
     def declspec(self) -> Type:
         start_tok = self.token()
         type_counter = 0
         ty_kind = TypeKind.INT
 
+        if start_tok.kind == TokenKind.TK_KEYWORD and start_tok.string != "typedef":
+            self.next()
+            return self.struct_union_decl(
+                TypeKind.STRUCT if start_tok.string == "struct" else TypeKind.UNION
+            )
+
         extant_tydef_found, ty = self.get_typedef(self.token().string)
         if extant_tydef_found:
             self.next()
@@ -446,89 +823,844 @@ class Parser:
         return Type(ty_kind)
 
 
-def _pre_process(content: str) -> str:
-    content = re.sub(
-        r"\[\s*(?:/\*)*\s*([a-zA-Z0-9_]+)\s*(?:\*/)*\s*\]", r"[\1]", content
+_IDENT_RE = re.compile(r"[a-zA-Z0-9_]+")
+_WS_RE = re.compile(r"\s+")
+_BRACKET_RE = re.compile(r"\[\s*(?:/\*)*\s*([a-zA-Z0-9_]+)\s*(?:\*/)*\s*\]")
+_ENUM_RE = re.compile(r"typedef\s+enum\b.*?{.*?}.*?;", re.S)
+_CLOSE_BRACE_RE = re.compile(r"}[^\S\n]*(?=\n|$)")
+_BOL_SPECIAL = r'(?P<directive>#)|(?P<brace>})|(?P<extern>extern\s*"C")'
+_BOL_SPECIAL_RE = re.compile(r"[^\S\n]*(?:" + _BOL_SPECIAL + ")")
+_SPECIAL_RE = re.compile(
+    r"/(?:(?P<line_comment>/)|(?P<comment>\*))|\n[^\S\n]*(?:" + _BOL_SPECIAL + r")"
+    r"|\[(?P<bracket>)(?=\s*/\*)|t(?P<enum>ypedef\s+enum)\b"
+)
+_MAX_MACRO_ALTS = 64
+_CHUNK_SIZE = 1 << 16
+_TOKEN_RE = re.compile(r"([*();{},:\[\]])|(\w+)|(\S)")
+_COMMENT_RE = re.compile(r"/\*.*?\*/|//.*", re.S)
+_DIRECTIVE_RE = re.compile(r"#(?:/\*.*?(?:\*/|\Z)|\\\n|[^\n])*", re.S)
+_DEFINE_RE = re.compile(r"#\s*define\s+([a-zA-Z0-9_]+)(?:\s+(.*))?", re.S)
+_UNDEF_RE = re.compile(r"#\s*undef\s+([a-zA-Z0-9_]+)")
+_MACRO_VAL_RE = re.compile(r"[(]*[0-9]+[x0-9 */+-<>|&%=()]*")
+_COND_RE = re.compile(r"#\s*(ifdef|ifndef|if|elif|else|endif)\b(.*)", re.S)
+_COND_LINE_RE = re.compile(r"^[ \t]*(#)[ \t]*(ifdef|ifndef|if|elif|else|endif)\b", re.M)
+_COND_TOKEN_RE = re.compile(
+    r"\s*(?:(0[xX][0-9a-fA-F]+|[0-9]+)[uUlL]*\b|([a-zA-Z_][a-zA-Z0-9_]*)"
+    r"|(&&|\|\||==|!=|<=|>=|<<|>>|[-+*/%<>&|^~!()?:]))"
+)
+
+
+def _bytes_re(pattern: re.Pattern) -> re.Pattern:
+    return re.compile(pattern.pattern.encode(), pattern.flags & ~re.UNICODE)
+
+
+_B_IDENT_RE = re.compile(rb"[a-zA-Z0-9_\x80-\xff]+")
+_B_TOKEN_RE = re.compile(rb"([*();{},:\[\]])|([a-zA-Z0-9_\x80-\xff]+)|(\S)")
+_B_DIRECTIVE_RE = _bytes_re(_DIRECTIVE_RE)
+_B_COND_LINE_RE = _bytes_re(_COND_LINE_RE)
+
+Macros = dict[str, Optional[str]]
+
+
+def _macro_value(val: Optional[str]) -> Optional[str]:
+    if val is None or not _MACRO_VAL_RE.fullmatch(val):
+        return None
+    return val
+
+
+def _has_values(macros: Macros) -> bool:
+    return any(_macro_value(val) is not None for val in macros.values())
+
+
+def _define_macro(
+    directive: str, macros: Macros, limits: Limits = _NO_LIMITS
+) -> Optional[str]:
+    directive = _COMMENT_RE.sub(" ", directive)
+    match = _UNDEF_RE.match(directive)
+    if match is not None:
+        macros.pop(match.group(1), None)
+        return None
+    match = _DEFINE_RE.match(directive)
+    if match is None:
+        return None
+    name = match.group(1)
+    if name not in macros:
+        _check_limit("macro count", len(macros) + 1, limits.max_macros)
+    val = _IDENT_RE.sub(
+        lambda m: _expand_macro(macros, m),
+        (match.group(2) or "").replace("\\\n", " ").strip(),
     )
+    _check_limit("macro expansion size", len(val), limits.max_macro_size)
+    if not _MACRO_VAL_RE.fullmatch(val):
+        macros[name] = val or None
+        return name
+    if all([x in "0123456789 */+-<>|&%=()" for x in val]):
+        try:
+            val = str(ConditionEvaluator(val, macros)())
+        except (ValueError, RecursionError):
+            pass
+    macros[name] = val
+    return name
+
+
+def _expand_macro(macros: Macros, match: re.Match) -> str:
+    val = _macro_value(macros.get(match.group(0)))
+    return match.group(0) if val is None else val
+
+
+def _div(a: int, b: int) -> int:
+    if b == 0:
+        raise ValueError("division by zero")
+    q = abs(a) // abs(b)
+    return -q if (a < 0) != (b < 0) else q
+
+
+def _shift(b: int) -> int:
+    if not 0 <= b < 64:
+        raise ValueError("shift out of range")
+    return b
+
+
+_COND_BINARY_OPS = {
+    "||": (1, lambda a, b: int(bool(a or b))),
+    "&&": (2, lambda a, b: int(bool(a and b))),
+    "|": (3, lambda a, b: a | b),
+    "^": (4, lambda a, b: a ^ b),
+    "&": (5, lambda a, b: a & b),
+    "==": (6, lambda a, b: int(a == b)),
+    "!=": (6, lambda a, b: int(a != b)),
+    "<": (7, lambda a, b: int(a < b)),
+    "<=": (7, lambda a, b: int(a <= b)),
+    ">": (7, lambda a, b: int(a > b)),
+    ">=": (7, lambda a, b: int(a >= b)),
+    "<<": (8, lambda a, b: a << _shift(b)),
+    ">>": (8, lambda a, b: a >> _shift(b)),
+    "+": (9, lambda a, b: a + b),
+    "-": (9, lambda a, b: a - b),
+    "*": (10, lambda a, b: a * b),
+    "/": (10, _div),
+    "%": (10, lambda a, b: a - b * _div(a, b)),
+}
+
+
+class ConditionEvaluator:
+    def __init__(
+        self, expr: str, macros: Macros, expanding: frozenset[str] = frozenset()
+    ):
+        self.macros = macros
+        self.expanding = expanding
+        self.tokens: list[tuple[int, str]] = []
+        idx = 0
+        while idx < len(expr):
+            match = _COND_TOKEN_RE.match(expr, idx)
+            if match is None:
+                if expr[idx:].isspace():
+                    break
+                raise ValueError(f"unexpected character {expr[idx]!r}")
+            self.tokens.append((match.lastindex or 0, match.group(match.lastindex)))
+            idx = match.end()
+        self.idx = 0
 
-    content = re.sub(r"/\*.*?\*/", "", content, flags=re.S)
-    content = re.sub(r"//.*$", "", content, flags=re.M)
-    content = re.sub(r"(?:typedef)\s*enum.*?{.*?}.*?;", "", content, flags=re.S)
-
-    pattern = re.compile(
-        r"#define\s+([a-zA-Z0-9_]+)\s+([(]*[0-9]+[x0-9 */+-<>|&%=()]*)\s*"
-    )
-    match = pattern.search(content)
-    while match:
-        line = match.group(0)
-        content = re.sub(re.escape(line), "", content)
-        ident = match.group(1)
-        val = match.group(2)
-        if all([x in "0123456789 */+-<>|&%=()" for x in val]):
-            val = str(eval(val))
-        content = re.sub(ident, val, content)
-        match = pattern.search(content)
+    def __call__(self) -> int:
+        val = self.conditional()
+        if self.idx < len(self.tokens):
+            raise ValueError(f"unexpected token {self.token()!r}")
+        return val
 
-    content = re.sub(r"^\s*#.*$", "", content, flags=re.M)
-    content = re.sub(r'^\s*extern "C".*$', "", content, flags=re.M)
-    content = re.sub(r"^}\s*$", "", content, flags=re.M)
-    content = re.sub(r"\s+$", "", content, flags=re.M)
-    return content
+    def token(self) -> str:
+        if self.idx >= len(self.tokens):
+            return ""
+        return self.tokens[self.idx][1]
 
+    def consume(self, s: str) -> bool:
+        if self.idx < len(self.tokens) and self.tokens[self.idx] == (3, s):
+            self.idx += 1
+            return True
+        return False
 
-def _is_ident_char(c: str) -> bool:
-    return c.isalpha() or c.isdigit() or c == "_"
+    def expect(self, s: str):
+        if not self.consume(s):
+            raise ValueError(f"expected {s!r}")
+
+    def conditional(self) -> int:
+        cond = self.binary(1)
+        if not self.consume("?"):
+            return cond
+        then_val = self.conditional()
+        self.expect(":")
+        else_val = self.conditional()
+        return then_val if cond else else_val
+
+    def binary(self, min_prec: int) -> int:
+        lhs = self.unary()
+        while self.idx < len(self.tokens) and self.tokens[self.idx][0] == 3:
+            prec, op = _COND_BINARY_OPS.get(self.token(), (0, None))
+            if op is None or prec < min_prec:
+                break
+            self.idx += 1
+            lhs = op(lhs, self.binary(prec + 1))
+        return lhs
+
+    def unary(self) -> int:
+        if self.consume("-"):
+            return -self.unary()
+        if self.consume("+"):
+            return self.unary()
+        if self.consume("!"):
+            return int(not self.unary())
+        if self.consume("~"):
+            return ~self.unary()
+        if self.token() == "defined":
+            self.idx += 1
+            paren = self.consume("(")
+            if self.idx >= len(self.tokens) or self.tokens[self.idx][0] != 2:
+                raise ValueError("expected macro name after 'defined'")
+            name = self.token()
+            self.idx += 1
+            if paren:
+                self.expect(")")
+            return int(name in self.macros)
+        return self.primary()
+
+    def primary(self) -> int:
+        if self.consume("("):
+            val = self.conditional()
+            self.expect(")")
+            return val
+        if self.idx >= len(self.tokens):
+            raise ValueError("expected expression")
+        group, s = self.tokens[self.idx]
+        self.idx += 1
+        if group == 1:
+            if s[:2] in ("0x", "0X"):
+                return int(s, 16)
+            return int(s, 8) if s.startswith("0") else int(s)
+        if group == 2:
+            val = self.macros.get(s)
+            if val is None or s in self.expanding:
+                return 0
+            return ConditionEvaluator(val, self.macros, self.expanding | {s})()
+        raise ValueError(f"unexpected token {s!r}")
+
+
+def _condition(op: str, expr: str, macros: Macros) -> bool:
+    if op != "if" and op != "elif":
+        name = _IDENT_RE.match(expr.strip())
+        if name is None:
+            return False
+        return (name.group(0) in macros) == (op == "ifdef")
+    try:
+        return bool(ConditionEvaluator(expr, macros)())
+    except (ValueError, RecursionError):
+        return False
 
 
-def _tokenise(content: str, err_rep: ErrorReporter) -> list[Token]:
-    line_num = 1
-    tokens = []
-    i = 0
-    while i < len(content):
-        c = content[i]
-        if c.isspace():
-            if c == "\n":
-                line_num += 1
-            i += 1
+def _conditional(directive: str, macros: Macros, conds: list[bool]) -> Optional[bool]:
+    match = _COND_RE.match(directive)
+    if match is None:
+        return None
+    op = match.group(1)
+    if op == "endif":
+        if conds:
+            conds.pop()
+        return True
+    if op == "else" or op == "elif":
+        return not conds
+    expr = _COMMENT_RE.sub(" ", match.group(2)).replace("\\\n", " ")
+    taken = _condition(op, expr, macros)
+    conds.append(taken)
+    return taken
+
+
+def _skip_inactive(
+    content: Union[str, bytes, mmap.mmap],
+    start: int,
+    end: int,
+    macros: Macros,
+    conds: list[bool],
+) -> int:
+    if isinstance(content, str):
+        line_re, directive_re = _COND_LINE_RE, _DIRECTIVE_RE
+    else:
+        line_re, directive_re = _B_COND_LINE_RE, _B_DIRECTIVE_RE
+    depth = 0
+    for match in line_re.finditer(content, start, end):
+        op = match.group(2)
+        if not isinstance(op, str):
+            op = op.decode()
+        if op.startswith("if"):
+            depth += 1
             continue
-        if c in "*();{},[]":
-            tokens.append(Token(TokenKind.TK_RESERVED, c, line_num, i))
-            i += 1
+        if op == "endif":
+            if depth:
+                depth -= 1
+                continue
+            conds.pop()
+        elif depth or conds[-1]:
             continue
-        if _is_ident_char(c):
-            w = ""
-            start_idx = i
-            while _is_ident_char(c):
-                w += c
-                i += 1
-                c = content[i]
-            if w in _IGNORED_KEYWORDS:
+        elif op == "elif":
+            directive_end = directive_re.match(content, match.start(1), end).end()
+            expr = content[match.end(2) : directive_end]
+            if not isinstance(expr, str):
+                expr = expr.decode(errors="replace")
+            expr = _COMMENT_RE.sub(" ", expr).replace("\\\n", " ")
+            if not _condition(op, expr, macros):
                 continue
-            if w in _KEYWORDS:
-                tokens.append(Token(TokenKind.TK_KEYWORD, w, line_num, start_idx))
+            conds[-1] = True
+            return directive_end
+        else:
+            conds[-1] = True
+        return directive_re.match(content, match.start(1), end).end()
+    return end
+
+
+class PreProcessor:
+    _SPECIAL_RE = _SPECIAL_RE
+    _BOL_SPECIAL_RE = _BOL_SPECIAL_RE
+    _IDENT_RE = _IDENT_RE
+    _IDENT_CHAR_RE = re.compile(r"\w")
+    _WS_RE = _WS_RE
+    _BRACKET_RE = _BRACKET_RE
+    _ENUM_RE = _ENUM_RE
+    _CLOSE_BRACE_RE = _CLOSE_BRACE_RE
+    _DIRECTIVE_RE = _DIRECTIVE_RE
+    _MACRO_PATTERN = "(?:{})\\b"
+    _NEWLINE = "\n"
+    _SPACE = " "
+    _EMPTY = ""
+    _COMMENT_END = "*/"
+    _LBRACE = "{"
+    _RBRACE = "}"
+
+    def __init__(
+        self,
+        content: str,
+        macros: Optional[Macros] = None,
+        limits: Optional[Limits] = None,
+        on_directive: Optional[Callable[[str], bool]] = None,
+    ):
+        self.content = content
+        self.limits = _NO_LIMITS if limits is None else limits
+        self.on_directive = on_directive
+        self.reset({} if macros is None else macros)
+        self.source_map = SourceMap()
+        self.pieces: list = []
+        self.out_len = 0
+        self.drained = 0
+        self.run_start = -1
+        self.run_end = -1
+        self.ws_start = 0
+        self.ws_end = 0
+        self.ws_sep = False
+
+    def reset(self, macros: Macros):
+        self.macros = macros
+        self.expand = _has_values(macros)
+        self.macro_re: Optional[re.Pattern] = None
+        self.conds: list[bool] = []
+        self.depth = 0
+        self.extern_c: list[int] = []
+        self.bol = True
+
+    def __call__(self) -> tuple[str, "SourceMap"]:
+        return self.pre_process()
+
+    def decode(self, raw: str) -> str:
+        return raw
+
+    def encode(self, s: str) -> str:
+        return s
+
+    def count(self, sub: str, start: int, end: int) -> int:
+        return self.content.count(sub, start, end)
+
+    def line_end(self, idx: int, end: int) -> int:
+        line_end = self.content.find(self._NEWLINE, idx, end)
+        return end if line_end < 0 else line_end
+
+    def follows_ident(self, idx: int) -> bool:
+        return idx > 0 and self._IDENT_CHAR_RE.match(self.content, idx - 1) is not None
+
+    def flush_run(self):
+        if self.run_start < 0:
+            return
+        self.pieces.append(self.content[self.run_start : self.run_end])
+        self.run_start = -1
+
+    def copy(self, start: int, end: int):
+        if self.run_start >= 0 and self.run_end == start:
+            self.run_end = end
+        else:
+            self.flush_run()
+            self.source_map.add(self.out_len, start)
+            self.run_start = start
+            self.run_end = end
+        self.out_len += end - start
+
+    def emit(self, s: str, src_idx: int):
+        self.flush_run()
+        self.source_map.add(self.out_len, src_idx)
+        self.pieces.append(s)
+        self.out_len += len(s)
+
+    def whitespace(self, start: int, end: int):
+        nl_idx = self.content.rfind(self._NEWLINE, start, end)
+        if nl_idx >= 0:
+            self.ws_start = nl_idx
+            self.ws_end = end
+            self.bol = True
+        elif self.ws_start == self.ws_end:
+            self.ws_start = start
+            self.ws_end = end
+        elif self.ws_end == start:
+            self.ws_end = end
+
+    def flush_whitespace(self):
+        if self.ws_start < self.ws_end:
+            self.copy(self.ws_start, self.ws_end)
+        elif self.ws_sep and self.out_len:
+            self.emit(self._SPACE, self.ws_start)
+        self.ws_start = self.ws_end = 0
+        self.ws_sep = False
+        self.bol = False
+
+    def ident(self, start: int, end: int):
+        self.flush_whitespace()
+        val = _macro_value(self.macros.get(self.decode(self.content[start:end])))
+        if val is None:
+            self.copy(start, end)
+        else:
+            self.emit(self.encode(val), start)
+
+    def macro_names(self) -> re.Pattern:
+        if self.macro_re is None:
+            names = [
+                name
+                for name, val in self.macros.items()
+                if _macro_value(val) is not None
+            ]
+            if len(names) > _MAX_MACRO_ALTS:
+                self.macro_re = self._IDENT_RE
+            else:
+                pattern = "|".join(map(re.escape, names))
+                self.macro_re = re.compile(
+                    self.encode(self._MACRO_PATTERN.format(pattern))
+                )
+        return self.macro_re
+
+    def expand_macros(self, start: int, end: int) -> int:
+        for match in self.macro_names().finditer(self.content, start, end):
+            if self.follows_ident(match.start()):
+                continue
+            val = _macro_value(self.macros.get(self.decode(match.group())))
+            if val is not None:
+                if start < match.start():
+                    self.copy(start, match.start())
+                self.emit(self.encode(val), match.start())
+                start = match.end()
+        return start
+
+    def text(self, start: int, end: int):
+        content = self.content
+        if self.ws_start < self.ws_end or self.ws_sep:
+            lead = self._WS_RE.match(content, start, end)
+            if lead is not None:
+                self.whitespace(start, lead.end())
+                start = lead.end()
+        stop = end
+        while stop > start and content[stop - 1 : stop].isspace():
+            stop -= 1
+        if stop > start:
+            self.flush_whitespace()
+            self.depth += self.count(self._LBRACE, start, stop)
+            self.depth -= self.count(self._RBRACE, start, stop)
+            if self.expand:
+                start = self.expand_macros(start, stop)
+            if start < stop:
+                self.copy(start, stop)
+        if stop < end:
+            self.whitespace(stop, end)
+
+    def directive(self, start: int, end: int, scan_end: int) -> int:
+        directive = self.decode(self.content[start:end])
+        if self.on_directive is not None and self.on_directive(directive):
+            self.expand = _has_values(self.macros)
+            self.macro_re = None
+            return end
+        active = _conditional(directive, self.macros, self.conds)
+        if active is None:
+            name = _define_macro(directive, self.macros, self.limits)
+            if _macro_value(self.macros.get(name or "")) is not None:
+                self.expand = True
+                if self.macro_re is not self._IDENT_RE:
+                    self.macro_re = None
+        elif not active:
+            return _skip_inactive(self.content, end, scan_end, self.macros, self.conds)
+        return end
+
+    def pre_process(self) -> tuple[str, "SourceMap"]:
+        self.scan(0, len(self.content))
+        return self.finish()
+
+    def finish(self) -> tuple[str, "SourceMap"]:
+        self.flush_run()
+        return self._EMPTY.join(self.pieces), self.source_map
+
+    def chunks(self, chunk_size: int) -> Iterator[tuple[int, str]]:
+        for _ in self.steps(0, len(self.content), chunk_size):
+            yield self.drain()
+        yield self.drain()
+
+    def drain(self) -> tuple[int, str]:
+        self.flush_run()
+        out_idx = self.drained
+        chunk = self._EMPTY.join(self.pieces)
+        self.pieces = []
+        self.drained = self.out_len
+        return out_idx, chunk
+
+    def scan(self, start: int, end: int):
+        for _ in self.steps(start, end):
+            pass
+
+    def steps(
+        self, start: int, end: int, chunk_size: Optional[int] = None
+    ) -> Iterator[None]:
+        content = self.content
+        i = start
+        while i < end:
+            if chunk_size is not None and self.out_len - self.drained >= chunk_size:
+                yield
+            match = self._BOL_SPECIAL_RE.match(content, i, end) if self.bol else None
+            if match is None:
+                match = self._SPECIAL_RE.search(content, i, end)
+            if chunk_size is not None:
+                text_end = end if match is None else match.start()
+                while text_end - i > chunk_size:
+                    nl_idx = content.rfind(self._NEWLINE, i + 1, i + chunk_size)
+                    if nl_idx < 0:
+                        break
+                    self.text(i, nl_idx)
+                    i = nl_idx
+                    yield
+            if match is None:
+                self.text(i, end)
+                return
+            kind = match.lastgroup
+            if kind == "line_comment":
+                self.text(i, match.start())
+                i = self.line_end(match.start(), end)
                 continue
-            if w in _TYPENAMES:
-                tokens.append(Token(TokenKind.TK_TYPENAME, w, line_num, start_idx))
+            if kind == "comment":
+                self.text(i, match.start())
+                comment_end = content.find(self._COMMENT_END, match.end(), end)
+                i = end if comment_end < 0 else comment_end + 2
+                self.ws_sep = True
                 continue
-            tokens.append(Token(TokenKind.TK_IDENT, w, line_num, start_idx))
+            if kind == "bracket":
+                bracket = self._BRACKET_RE.match(content, match.start(), end)
+                if bracket is not None:
+                    self.text(i, match.start() + 1)
+                    self.ident(bracket.start(1), bracket.end(1))
+                    self.copy(bracket.end() - 1, bracket.end())
+                    i = bracket.end()
+                    continue
+            elif kind == "enum":
+                enum = None
+                if not self.follows_ident(match.start()):
+                    enum = self._ENUM_RE.match(content, match.start(), end)
+                if enum is not None:
+                    self.text(i, match.start())
+                    i = enum.end()
+                    continue
+            else:
+                special = match.start(kind)
+                self.text(i, special)
+                i = special
+                if kind == "directive":
+                    directive_end = self._DIRECTIVE_RE.match(
+                        content, special, end
+                    ).end()
+                    i = self.directive(special, directive_end, end)
+                    continue
+                if kind == "extern":
+                    i = self.line_end(special, end)
+                    if content.find(self._LBRACE, special, i) >= 0:
+                        self.extern_c.append(self.depth)
+                    continue
+                if self.extern_c and self.extern_c[-1] == self.depth:
+                    brace = self._CLOSE_BRACE_RE.match(content, special, end)
+                    if brace is not None:
+                        self.extern_c.pop()
+                        i = brace.end()
+                        continue
+            self.text(i, match.end())
+            i = match.end()
+
+
+class BytesPreProcessor(PreProcessor):
+    _SPECIAL_RE = _bytes_re(_SPECIAL_RE)
+    _BOL_SPECIAL_RE = _bytes_re(_BOL_SPECIAL_RE)
+    _IDENT_RE = _B_IDENT_RE
+    _IDENT_CHAR_RE = re.compile(rb"[a-zA-Z0-9_\x80-\xff]")
+    _WS_RE = _bytes_re(_WS_RE)
+    _BRACKET_RE = _bytes_re(_BRACKET_RE)
+    _ENUM_RE = _bytes_re(_ENUM_RE)
+    _CLOSE_BRACE_RE = _bytes_re(_CLOSE_BRACE_RE)
+    _DIRECTIVE_RE = _B_DIRECTIVE_RE
+    _MACRO_PATTERN = "(?:{})\\b(?![\\x80-\\xff])"
+    _NEWLINE = b"\n"
+    _SPACE = b" "
+    _EMPTY = b""
+    _COMMENT_END = b"*/"
+    _LBRACE = b"{"
+    _RBRACE = b"}"
+
+    def decode(self, raw: bytes) -> str:
+        return raw.decode(errors="replace")
+
+    def encode(self, s: str) -> bytes:
+        return s.encode()
+
+    def count(self, sub: bytes, start: int, end: int) -> int:
+        return self.content[start:end].count(sub)
+
+
+def _pre_process(content: str) -> str:
+    return PreProcessor(content)()[0]
+
+
+def _classify(w: str) -> Optional[TokenKind]:
+    if w in _IGNORED_KEYWORDS:
+        return None
+    if w in _KEYWORDS:
+        return TokenKind.TK_KEYWORD
+    if w in _TYPENAMES:
+        return TokenKind.TK_TYPENAME
+    return TokenKind.TK_IDENT
+
+
+def _decode_word(words: dict[bytes, str], raw: bytes) -> str:
+    w = words.get(raw)
+    if w is None:
+        w = raw.decode(errors="replace")
+        words[raw] = w
+    return w
+
+
+def _tokenise(
+    content: Union[str, bytes],
+    err_rep: ErrorReporter,
+    start: int = 0,
+    end: Optional[int] = None,
+    offset: int = 0,
+) -> list[Token]:
+    if isinstance(content, str):
+        token_re, newline, words = _TOKEN_RE, "\n", None
+    else:
+        token_re, newline, words = _B_TOKEN_RE, b"\n", {}
+    line_num = 1
+    line_idx = start
+    tokens = []
+    for match in token_re.finditer(
+        content, start, len(content) if end is None else end
+    ):
+        i = match.start()
+        line_num += content.count(newline, line_idx, i)
+        line_idx = i
+        if match.lastindex == 1:
+            c = match.group(1)
+            if words is not None:
+                c = words.get(c) or _decode_word(words, c)
+            tokens.append(Token(TokenKind.TK_RESERVED, c, line_num, i + offset))
             continue
-        err_rep.report_err(line_num, i, "unexpected token")
+        if match.lastindex == 2:
+            w = match.group(2)
+            if words is not None:
+                w = words.get(w) or _decode_word(words, w)
+            kind = _classify(w)
+            if kind is not None:
+                tokens.append(Token(kind, w, line_num, i + offset))
+            continue
+        err_rep.report_err(line_num, i + offset, "unexpected token")
     return tokens
 
 
-def _parse_tokens(tokens: list[Token], err_rep: ErrorReporter) -> dict[str, Type]:
-    parser = Parser(tokens, err_rep)
+def _parse_tokens(
+    tokens: list[Token],
+    err_rep: ErrorReporter,
+    limits: Optional[Limits] = None,
+    deadline: Optional[float] = None,
+) -> dict[str, Type]:
+    if limits is not None:
+        _check_limit("token count", len(tokens), limits.max_tokens)
+    parser = Parser(tokens, err_rep, limits, deadline)
     return parser()
 
 
-def parse_decls(decl_strs: list[str]) -> dict[str, Type]:
-    decls = {}
+def _statement_end(tokens: list[Token], depth: int) -> tuple[int, int]:
+    end = 0
+    for i, token in enumerate(tokens):
+        s = token.string
+        if s == "{":
+            depth += 1
+        elif s == "}":
+            depth -= 1
+        elif s == ";" and not depth:
+            end = i + 1
+    return end, depth
+
+
+def _parse_chunks(pre_processor: PreProcessor, parser: Parser) -> dict[str, Type]:
+    pending: list[Token] = []
+    depth = 0
+    n_tokens = 0
+    for out_idx, chunk in pre_processor.chunks(_CHUNK_SIZE):
+        tokens = _tokenise(chunk, parser.err_rep, offset=out_idx)
+        n_tokens += len(tokens)
+        _check_limit("token count", n_tokens, parser.limits.max_tokens)
+        end, depth = _statement_end(tokens, depth)
+        if not end:
+            pending += tokens
+            continue
+        parser.tokens = pending + tokens[:end]
+        parser.idx = 0
+        parser.parse()
+        pending = tokens[end:]
+    if pending:
+        parser.tokens = pending
+        parser.idx = 0
+        parser.parse()
+    return parser.decls
+
+
+def _pre_process_batch(
+    decl_strs: list[str],
+    limits: Optional[Limits] = None,
+    defines: Optional[Macros] = None,
+) -> tuple[str, BatchErrorReporter, list[int]]:
+    if limits is not None:
+        for decl_str in decl_strs:
+            _check_limit("input size", len(decl_str), limits.max_input_size)
+    pre_processor = PreProcessor("\n".join(decl_strs), limits=limits)
+    src_starts = []
+    out_starts = []
+    start = 0
     for decl_str in decl_strs:
-        err_rep = ErrorReporter(decl_str)
-        decl_str = _pre_process(decl_str)
+        end = start + len(decl_str)
+        src_starts.append(start)
+        out_starts.append(pre_processor.out_len)
+        pre_processor.reset({} if defines is None else dict(defines))
+        pre_processor.scan(start, end)
+        if end < len(pre_processor.content):
+            pre_processor.whitespace(end, end + 1)
+        start = end + 1
+    content, source_map = pre_processor.finish()
+    err_rep = BatchErrorReporter(decl_strs, source_map, src_starts, out_starts)
+    return content, err_rep, out_starts + [len(content)]
+
+
+def parse_decls(
+    decl_strs: list[str],
+    limits: Optional[Limits] = None,
+    defines: Optional[Macros] = None,
+) -> dict[str, Type]:
+    decls = {}
+    deadline = None if limits is None else limits.deadline()
+    content, err_rep, bounds = _pre_process_batch(decl_strs, limits, defines)
+    for start, end in zip(bounds, bounds[1:]):
         try:
-            tokens = _tokenise(decl_str, err_rep)
-            decls |= _parse_tokens(tokens, err_rep)
+            tokens = _tokenise(content, err_rep, start, end)
+            decls |= _parse_tokens(tokens, err_rep, limits, deadline)
         except RuntimeError as e:
             print(e)
     return decls
+
+
+def _gil_enabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is None or is_gil_enabled()
+
+
+def _parse_input(
+    decl_str: str,
+    typedefs: Mapping[str, Type],
+    limits: Optional[Limits],
+    defines: Optional[Macros],
+    deadline: Optional[float],
+) -> tuple[dict[str, Type], Optional[str]]:
+    if limits is not None:
+        _check_limit("input size", len(decl_str), limits.max_input_size)
+    macros = {} if defines is None else dict(defines)
+    content, source_map = PreProcessor(decl_str, macros, limits)()
+    err_rep = ErrorReporter(decl_str, source_map)
+    try:
+        tokens = _tokenise(content, err_rep)
+        if limits is not None:
+            _check_limit("token count", len(tokens), limits.max_tokens)
+        parser = Parser(tokens, err_rep, limits, deadline)
+        parser.typedefs = dict(typedefs)
+        return parser(), None
+    except RuntimeError as e:
+        return {}, str(e)
+
+
+def parse_many(
+    decl_strs: list[str],
+    executor: Optional[Executor] = None,
+    typedefs: Optional[Mapping[str, Type]] = None,
+    limits: Optional[Limits] = None,
+    defines: Optional[Macros] = None,
+) -> dict[str, Type]:
+    shared = MappingProxyType(dict(typedefs or {}))
+    deadline = None if limits is None else limits.deadline()
+
+    def parse(decl_str: str) -> tuple[dict[str, Type], Optional[str]]:
+        return _parse_input(decl_str, shared, limits, defines, deadline)
+
+    if executor is not None:
+        results = list(executor.map(parse, decl_strs))
+    elif _gil_enabled() or len(decl_strs) < 2:
+        results = [parse(decl_str) for decl_str in decl_strs]
+    else:
+        with ThreadPoolExecutor() as pool:
+            results = list(pool.map(parse, decl_strs))
+
+    decls = {}
+    for input_decls, err in results:
+        if err is not None:
+            print(err)
+        decls |= input_decls
+    return decls
+
+
+def parse_buffer(
+    content: Union[bytes, mmap.mmap],
+    limits: Optional[Limits] = None,
+    defines: Optional[Macros] = None,
+) -> dict[str, Type]:
+    deadline = None
+    if limits is not None:
+        _check_limit("input size", len(content), limits.max_input_size)
+        deadline = limits.deadline()
+    try:
+        macros = {} if defines is None else dict(defines)
+        pre_processor = BytesPreProcessor(content, macros, limits)
+        err_rep = BytesErrorReporter(content, pre_processor.source_map)
+        return _parse_chunks(pre_processor, Parser([], err_rep, limits, deadline))
+    except RuntimeError as e:
+        print(e)
+    return {}
+
+
+def parse_file(
+    path: str, limits: Optional[Limits] = None, defines: Optional[Macros] = None
+) -> dict[str, Type]:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if limits is not None:
+            _check_limit("input size", size, limits.max_input_size)
+        if size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            return parse_buffer(content, limits, defines)
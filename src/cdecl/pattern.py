@@ -0,0 +1,232 @@
+import re
+from typing import Callable, Optional, Union
+
+from cdecl.parse import ErrorReporter, Parser, Type, TypeKind
+
+
+_PATTERN_TOKEN_RE = re.compile(
+    r"\s*(->|\.\.\.|\$?[a-zA-Z_][a-zA-Z0-9_]*|[0-9]+|[()\[\],])"
+)
+
+_NAME_TO_TYKIND = {kind.name.lower(): kind for kind in TypeKind} | Parser._TOK_TO_TYKIND
+
+Bindings = dict[str, Type]
+Matcher = Callable[[Type, Bindings], bool]
+
+
+def _match_any(ty: Type, bindings: Bindings) -> bool:
+    return True
+
+
+class Pattern:
+    def __init__(
+        self,
+        pattern: str,
+        matcher: Matcher,
+        kind: Optional[TypeKind],
+        func_arity: Optional[tuple[int, bool]],
+    ):
+        self.pattern = pattern
+        self.matcher = matcher
+        self.kind = kind
+        self.func_arity = func_arity
+
+    def __repr__(self) -> str:
+        return f"Pattern({self.pattern!r})"
+
+    def candidate(self, ty: Type) -> bool:
+        if self.kind is not None and ty.kind != self.kind:
+            return False
+        if self.func_arity is None:
+            return True
+        while ty.kind != TypeKind.FUNC:
+            if ty.base is None:
+                return False
+            ty = ty.base
+        arity, variadic = self.func_arity
+        n_params = 0 if ty.params is None else len(ty.params)
+        return n_params >= arity if variadic else n_params == arity
+
+    def match(self, ty: Type) -> Optional[Bindings]:
+        if not self.candidate(ty):
+            return None
+        bindings: Bindings = {}
+        if self.matcher(ty, bindings):
+            return bindings
+        return None
+
+    def scan(self, decls: dict[str, Type]) -> list[tuple[str, Bindings]]:
+        matches = []
+        matcher = self.matcher
+        candidate = self.candidate
+        for name, ty in decls.items():
+            if not candidate(ty):
+                continue
+            bindings: Bindings = {}
+            if matcher(ty, bindings):
+                matches.append((name, bindings))
+        return matches
+
+
+class PatternCompiler:
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.err_rep = ErrorReporter(pattern)
+        self.tokens: list[tuple[str, int]] = []
+        idx = 0
+        while idx < len(pattern):
+            match = _PATTERN_TOKEN_RE.match(pattern, idx)
+            if match is None:
+                if pattern[idx:].isspace():
+                    break
+                self.err_rep.report_err(1, idx, "unexpected token")
+            assert match is not None
+            self.tokens.append((match.group(1), match.start(1)))
+            idx = match.end()
+        self.idx = 0
+
+    def __call__(self) -> Pattern:
+        return self.compile()
+
+    def token(self) -> str:
+        if self.idx >= len(self.tokens):
+            return ""
+        return self.tokens[self.idx][0]
+
+    def error(self, err_msg: str):
+        if self.idx >= len(self.tokens):
+            content_idx = len(self.pattern.rstrip())
+        else:
+            content_idx = self.tokens[self.idx][1]
+        self.err_rep.report_err(1, content_idx, err_msg)
+
+    def consume(self, s: str) -> bool:
+        if self.token() == s:
+            self.idx += 1
+            return True
+        return False
+
+    def expect(self, s: str):
+        if not self.consume(s):
+            self.error(f"expected '{s}'")
+
+    def compile(self) -> Pattern:
+        matcher, kind, func_arity = self.pat()
+        if self.idx < len(self.tokens):
+            self.error("unexpected trailing token")
+        return Pattern(self.pattern, matcher, kind, func_arity)
+
+    def pat(self) -> tuple[Matcher, Optional[TypeKind], Optional[tuple[int, bool]]]:
+        name = self.token()
+        if not name or not (name[0].isalpha() or name[0] in "_$"):
+            self.error("expected pattern")
+        self.idx += 1
+
+        if name == "_":
+            return _match_any, None, None
+        if name.startswith("$"):
+            return _capture(name[1:]), None, None
+        if name == "ptr":
+            self.expect("(")
+            base, _, func_arity = self.pat()
+            self.expect(")")
+            return _kind_with_base(TypeKind.PTR, base), TypeKind.PTR, func_arity
+        if name == "arr":
+            array_len: Optional[Union[int, str]] = None
+            if self.consume("["):
+                array_len = self.token()
+                self.idx += 1
+                if array_len.isdigit():
+                    array_len = int(array_len)
+                self.expect("]")
+            self.expect("(")
+            base, _, func_arity = self.pat()
+            self.expect(")")
+            return _array(array_len, base), TypeKind.ARR, func_arity
+        if name == "func":
+            self.expect("(")
+            params = []
+            variadic = False
+            while not self.consume(")"):
+                if params or variadic:
+                    self.expect(",")
+                if self.consume("..."):
+                    variadic = True
+                    continue
+                if variadic:
+                    self.error("'...' must be the last parameter")
+                params.append(self.pat()[0])
+            ret = self.pat()[0] if self.consume("->") else _match_any
+            return (
+                _func(params, variadic, ret),
+                TypeKind.FUNC,
+                (len(params), variadic),
+            )
+        if name in _NAME_TO_TYKIND:
+            kind = _NAME_TO_TYKIND[name]
+            return _kind(kind), kind, None
+        return _typedef(name), None, None
+
+
+def _capture(name: str) -> Matcher:
+    def match(ty: Type, bindings: Bindings) -> bool:
+        if name in bindings:
+            return bindings[name] == ty
+        bindings[name] = ty
+        return True
+
+    return match
+
+
+def _kind(kind: TypeKind) -> Matcher:
+    def match(ty: Type, bindings: Bindings) -> bool:
+        return ty.kind == kind
+
+    return match
+
+
+def _typedef(typedef_name: str) -> Matcher:
+    def match(ty: Type, bindings: Bindings) -> bool:
+        return ty.typedef_name == typedef_name
+
+    return match
+
+
+def _kind_with_base(kind: TypeKind, base: Matcher) -> Matcher:
+    def match(ty: Type, bindings: Bindings) -> bool:
+        return ty.kind == kind and ty.base is not None and base(ty.base, bindings)
+
+    return match
+
+
+def _array(array_len: Optional[Union[int, str]], base: Matcher) -> Matcher:
+    match_base = _kind_with_base(TypeKind.ARR, base)
+    if array_len is None:
+        return match_base
+
+    def match(ty: Type, bindings: Bindings) -> bool:
+        return ty.array_len == array_len and match_base(ty, bindings)
+
+    return match
+
+
+def _func(params: list[Matcher], variadic: bool, ret: Matcher) -> Matcher:
+    arity = len(params)
+
+    def match(ty: Type, bindings: Bindings) -> bool:
+        if ty.kind != TypeKind.FUNC:
+            return False
+        ty_params = [] if ty.params is None else ty.params
+        if len(ty_params) < arity or (not variadic and len(ty_params) != arity):
+            return False
+        for param, (param_ty, _) in zip(params, ty_params):
+            if not param(param_ty, bindings):
+                return False
+        assert ty.ret_ty is not None
+        return ret(ty.ret_ty, bindings)
+
+    return match
+
+
+def compile_pattern(pattern: str) -> Pattern:
+    return PatternCompiler(pattern)()
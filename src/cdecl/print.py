@@ -1,7 +1,41 @@
+import sys
+
+from cdecl.diff import DeclDiff
 from cdecl.parse import Type
+from cdecl.render import CRenderer, EnglishRenderer
+from cdecl.symbols import Symbol
 
 
 def print_decls(decls: dict[str, Type]):
     for ident, ty in decls.items():
         print(ident)
         print(ty)
+
+
+def print_c_decls(decls: dict[str, Type]):
+    sys.stdout.write(CRenderer().render_decls(decls))
+
+
+def print_explanations(decls: dict[str, Type]):
+    sys.stdout.write(EnglishRenderer().render_decls(decls))
+
+
+def print_diff(diff: DeclDiff, prefix: str = ""):
+    for name in diff.removed:
+        print(f"{prefix}- {name}")
+    for name in diff.added:
+        print(f"{prefix}+ {name}")
+    for name, paths in diff.changed.items():
+        print(f"{prefix}~ {name}: {', '.join(paths)}")
+
+
+def print_file_diff(path: str, diff: DeclDiff):
+    print_diff(diff, f"{path}: ")
+    sys.stdout.flush()
+
+
+def print_symbols(symbols: list[Symbol]):
+    for symbol in symbols:
+        print(
+            f"{symbol.line_num}:{symbol.col} {symbol.kind.name.lower()} {symbol.name}"
+        )
@@ -0,0 +1,219 @@
+from typing import Optional
+
+from cdecl.parse import Type, TypeKind
+
+
+_TYKIND_TO_C = {
+    TypeKind.VOID: "void",
+    TypeKind.BOOL: "bool",
+    TypeKind.CHAR: "char",
+    TypeKind.SHORT: "short",
+    TypeKind.INT: "int",
+    TypeKind.LONG: "long",
+    TypeKind.LLONG: "long long",
+    TypeKind.UCHAR: "unsigned char",
+    TypeKind.USHORT: "unsigned short",
+    TypeKind.UINT: "unsigned int",
+    TypeKind.ULONG: "unsigned long",
+    TypeKind.ULLONG: "unsigned long long",
+    TypeKind.FLOAT: "float",
+    TypeKind.DOUBLE: "double",
+    TypeKind.I8: "int8_t",
+    TypeKind.I16: "int16_t",
+    TypeKind.I32: "int32_t",
+    TypeKind.I64: "int64_t",
+    TypeKind.U8: "uint8_t",
+    TypeKind.U16: "uint16_t",
+    TypeKind.U32: "uint32_t",
+    TypeKind.U64: "uint64_t",
+    TypeKind.SIZE: "size_t",
+    TypeKind.SSIZE: "ssize_t",
+}
+
+
+def _array_len(ty: Type) -> str:
+    return "" if not ty.array_len else str(ty.array_len)
+
+
+def _aggregate_name(ty: Type) -> str:
+    return f"{ty.kind.name.lower()} {ty.tag}" if ty.tag is not None else ""
+
+
+class CRenderer:
+    def __init__(self):
+        self.memo: dict[int, tuple[Type, str]] = {}
+
+    def params(self, ty: Type) -> str:
+        cached = self.memo.get(id(ty))
+        if cached is not None:
+            return cached[1]
+
+        out = ["(" if ty.params is not None else "(void"]
+        for i, (param_ty, param_ident) in enumerate(ty.params or []):
+            if i:
+                out.append(", ")
+            self.write(out, param_ty, param_ident or "")
+        out.append(")")
+        params = "".join(out)
+        self.memo[id(ty)] = (ty, params)
+        return params
+
+    def aggregate(self, ty: Type) -> str:
+        if ty.tag is not None or ty.members is None:
+            return _aggregate_name(ty)
+        cached = self.memo.get(id(ty))
+        if cached is not None:
+            return cached[1]
+
+        out = [ty.kind.name.lower(), " { "]
+        for member_ty, name, bit_width in ty.members:
+            self.write(out, member_ty, name or "")
+            if bit_width is not None:
+                out.append(f" : {bit_width}")
+            out.append("; ")
+        out.append("}")
+        aggregate = "".join(out)
+        self.memo[id(ty)] = (ty, aggregate)
+        return aggregate
+
+    def write(self, out: list[str], ty: Type, ident: str):
+        prefix = []
+        suffix = []
+        prev_ptr = False
+        while ty.typedef_name is None and ty.kind in (
+            TypeKind.PTR,
+            TypeKind.ARR,
+            TypeKind.FUNC,
+        ):
+            if ty.kind == TypeKind.PTR:
+                assert ty.base is not None
+                prefix.append("*")
+                prev_ptr = True
+                ty = ty.base
+                continue
+            if prev_ptr:
+                prefix.append("(")
+                suffix.append(")")
+                prev_ptr = False
+            if ty.kind == TypeKind.ARR:
+                assert ty.base is not None
+                suffix.append(f"[{_array_len(ty)}]")
+                ty = ty.base
+            else:
+                assert ty.ret_ty is not None
+                suffix.append(self.params(ty))
+                ty = ty.ret_ty
+
+        if ty.typedef_name is not None:
+            out.append(ty.typedef_name)
+        elif ty.kind in (TypeKind.STRUCT, TypeKind.UNION):
+            out.append(self.aggregate(ty))
+        else:
+            out.append(_TYKIND_TO_C[ty.kind])
+        if prefix or ident or suffix:
+            out.append(" ")
+        out.extend(reversed(prefix))
+        out.append(ident)
+        out.extend(suffix)
+
+    def render(self, ty: Type, ident: Optional[str] = None) -> str:
+        out: list[str] = []
+        self.write(out, ty, ident or "")
+        return "".join(out)
+
+    def render_decls(self, decls: dict[str, Type]) -> str:
+        out: list[str] = []
+        for ident, ty in decls.items():
+            self.write(out, ty, ident)
+            out.append(";\n")
+        return "".join(out)
+
+
+class EnglishRenderer:
+    def __init__(self):
+        self.memo: dict[int, tuple[Type, str]] = {}
+
+    def function(self, ty: Type) -> str:
+        cached = self.memo.get(id(ty))
+        if cached is not None:
+            return cached[1]
+
+        out = ["function "]
+        if ty.params is None:
+            out.append("(void) ")
+        elif ty.params:
+            out.append("(")
+            for i, (param_ty, param_ident) in enumerate(ty.params):
+                if i:
+                    out.append(", ")
+                if param_ident is not None:
+                    out.append(param_ident)
+                    out.append(" as ")
+                self.write(out, param_ty)
+            out.append(") ")
+        out.append("returning ")
+        assert ty.ret_ty is not None
+        self.write(out, ty.ret_ty)
+        function = "".join(out)
+        self.memo[id(ty)] = (ty, function)
+        return function
+
+    def aggregate(self, ty: Type) -> str:
+        if ty.tag is not None or ty.members is None:
+            return _aggregate_name(ty)
+        cached = self.memo.get(id(ty))
+        if cached is not None:
+            return cached[1]
+
+        out = [ty.kind.name.lower(), " ("]
+        for i, (member_ty, name, bit_width) in enumerate(ty.members):
+            if i:
+                out.append(", ")
+            if name is not None:
+                out.append(name)
+                out.append(" as ")
+            if bit_width is not None:
+                out.append(f"bitfield {bit_width} of ")
+            self.write(out, member_ty)
+        out.append(")")
+        aggregate = "".join(out)
+        self.memo[id(ty)] = (ty, aggregate)
+        return aggregate
+
+    def write(self, out: list[str], ty: Type):
+        while ty.typedef_name is None:
+            if ty.kind == TypeKind.PTR:
+                assert ty.base is not None
+                out.append("pointer to ")
+                ty = ty.base
+            elif ty.kind == TypeKind.ARR:
+                assert ty.base is not None
+                out.append("array ")
+                if ty.array_len:
+                    out.append(str(ty.array_len))
+                    out.append(" ")
+                out.append("of ")
+                ty = ty.base
+            elif ty.kind == TypeKind.FUNC:
+                out.append(self.function(ty))
+                return
+            elif ty.kind in (TypeKind.STRUCT, TypeKind.UNION):
+                out.append(self.aggregate(ty))
+                return
+            else:
+                out.append(_TYKIND_TO_C[ty.kind])
+                return
+        out.append(ty.typedef_name)
+
+    def render(self, ty: Type, ident: Optional[str] = None) -> str:
+        out = [] if ident is None else ["declare ", ident, " as "]
+        self.write(out, ty)
+        return "".join(out)
+
+    def render_decls(self, decls: dict[str, Type]) -> str:
+        out: list[str] = []
+        for ident, ty in decls.items():
+            out.extend(("declare ", ident, " as "))
+            self.write(out, ty)
+            out.append("\n")
+        return "".join(out)
@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Iterable, Iterator
+
+from cdecl.parse import (
+    _TOKEN_RE,
+    ErrorReporter,
+    PreProcessor,
+    TokenKind,
+    _classify,
+)
+
+
+class SymbolKind(Enum):
+    FUNC = auto()
+    VAR = auto()
+    TYPEDEF = auto()
+
+
+@dataclass
+class Symbol:
+    name: str
+    kind: SymbolKind
+    line_num: int
+    col: int
+    content_idx: int
+
+
+Stream = Iterable[tuple[TokenKind, str, int]]
+
+
+def _text_stream(content: str, err_rep: ErrorReporter) -> Stream:
+    for match in _TOKEN_RE.finditer(content):
+        if match.lastindex == 1:
+            yield TokenKind.TK_RESERVED, match.group(1), match.start()
+        elif match.lastindex == 2:
+            w = match.group(2)
+            kind = _classify(w)
+            if kind is not None:
+                yield kind, w, match.start()
+        else:
+            line_num, _ = err_rep.locate(match.start())
+            err_rep.report_err(line_num, match.start(), "unexpected token")
+
+
+def _declarations(
+    stream: Stream,
+) -> Iterator[tuple[int, int, str, int, bool, bool]]:
+    stmt_idx = 0
+    decl_idx = 0
+    in_spec = True
+    spec_seen = False
+    is_typedef = False
+    depth = 0
+    braces = 0
+    name = None
+    is_func = False
+    prev = ""
+    for kind, s, content_idx in stream:
+        if braces:
+            if kind == TokenKind.TK_RESERVED and s == "{":
+                braces += 1
+            elif kind == TokenKind.TK_RESERVED and s == "}":
+                braces -= 1
+            continue
+
+        if in_spec:
+            if kind == TokenKind.TK_KEYWORD:
+                if s == "typedef":
+                    is_typedef = True
+                continue
+            if kind == TokenKind.TK_RESERVED and s == "{":
+                braces = 1
+                spec_seen = True
+                continue
+            if kind == TokenKind.TK_TYPENAME or (
+                kind == TokenKind.TK_IDENT and not spec_seen
+            ):
+                spec_seen = True
+                continue
+            in_spec = False
+            decl_idx = content_idx
+
+        if depth:
+            if kind == TokenKind.TK_RESERVED and s in "([":
+                depth += 1
+            elif kind == TokenKind.TK_RESERVED and s in ")]":
+                depth -= 1
+            prev = s
+            continue
+
+        if kind == TokenKind.TK_RESERVED:
+            if s == "," or s == ";":
+                if name is not None:
+                    yield stmt_idx, decl_idx, *name, is_typedef, is_func
+                name = None
+                is_func = False
+                decl_idx = content_idx + 1
+                if s == ";":
+                    stmt_idx = content_idx + 1
+                    in_spec = True
+                    spec_seen = False
+                    is_typedef = False
+                prev = ""
+                continue
+            if s == "[" or (
+                s == "(" and (prev.isidentifier() or prev == ")" or prev == "]")
+            ):
+                if s == "(" and name is not None and prev == name[0]:
+                    is_func = True
+                depth = 1
+        elif kind == TokenKind.TK_IDENT and name is None:
+            name = (s, content_idx)
+        prev = s
+
+    if name is not None:
+        yield stmt_idx, decl_idx, *name, is_typedef, is_func
+
+
+def _scan(stream: Stream, err_rep: ErrorReporter) -> list[Symbol]:
+    symbols = []
+    for _, _, name, content_idx, is_typedef, is_func in _declarations(stream):
+        line_num, col = err_rep.locate(content_idx)
+        if err_rep.source_map is not None:
+            content_idx = err_rep.source_map.resolve(content_idx)
+        if is_typedef:
+            kind = SymbolKind.TYPEDEF
+        elif is_func:
+            kind = SymbolKind.FUNC
+        else:
+            kind = SymbolKind.VAR
+        symbols.append(Symbol(name, kind, line_num, col, content_idx))
+    return symbols
+
+
+def scan_symbols(decl_strs: list[str]) -> list[Symbol]:
+    symbols = []
+    for decl_str in decl_strs:
+        content, source_map = PreProcessor(decl_str)()
+        err_rep = ErrorReporter(decl_str, source_map)
+        try:
+            symbols += _scan(_text_stream(content, err_rep), err_rep)
+        except RuntimeError as e:
+            print(e)
+    return symbols
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from cdecl.diff import DeclDiff, diff_decls, header_paths
+from cdecl.include import IncludeSession
+from cdecl.parse import Type
+
+
+@dataclass
+class WatchedFile:
+    mtime_ns: int
+    size: int
+    digest: bytes
+    decls: dict[str, Type] = field(default_factory=dict)
+
+
+class HeaderWatcher:
+    def __init__(self, root: str):
+        self.root = root
+        self.files: dict[str, WatchedFile] = {}
+        self.session = IncludeSession([root])
+
+    def decls(self) -> dict[str, Type]:
+        decls = {}
+        for watched in self.files.values():
+            decls |= watched.decls
+        return decls
+
+    def poll(self) -> list[tuple[str, DeclDiff]]:
+        diffs = []
+        seen = set()
+        stale: set[str] = set()
+        paths = header_paths(self.root)
+        for path in paths:
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            watched = self.files.get(path)
+            if (
+                watched is not None
+                and watched.mtime_ns == st.st_mtime_ns
+                and watched.size == st.st_size
+            ):
+                continue
+
+            with open(path, "rb") as f:
+                content = f.read()
+            digest = hashlib.blake2b(content, digest_size=16).digest()
+            if watched is None:
+                self.files[path] = WatchedFile(st.st_mtime_ns, st.st_size, digest)
+            else:
+                watched.mtime_ns = st.st_mtime_ns
+                watched.size = st.st_size
+                if watched.digest == digest:
+                    continue
+                watched.digest = digest
+            stale |= self.session.invalidate(os.path.realpath(path))
+
+        removed = [path for path in self.files if path not in seen]
+        for path in removed:
+            stale |= self.session.invalidate(os.path.realpath(path))
+
+        if stale:
+            for path in paths:
+                watched = self.files.get(path)
+                real_path = os.path.realpath(path)
+                if watched is None or real_path not in stale:
+                    continue
+                header = self.session.header(real_path)
+                decls = {} if header is None else dict(header.own_decls)
+                diff = diff_decls(watched.decls, decls)
+                watched.decls = decls
+                if diff.added or diff.removed or diff.changed:
+                    diffs.append((path, diff))
+
+        for path in removed:
+            watched = self.files.pop(path)
+            if watched.decls:
+                diffs.append((path, DeclDiff(removed=list(watched.decls))))
+        return diffs
+
+
+def watch(
+    root: str,
+    on_diff: Callable[[str, DeclDiff], None],
+    interval: float = 1.0,
+):
+    watcher = HeaderWatcher(root)
+    watcher.poll()
+    while True:
+        time.sleep(interval)
+        for path, diff in watcher.poll():
+            on_diff(path, diff)
@@ -1,3 +1,6 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from pytest import raises
 
 from cdecl.parse import (
@@ -6,7 +9,25 @@ from cdecl.parse import (
     _parse_tokens,
     TypeKind,
     ErrorReporter,
+    LimitExceeded,
+    Limits,
+    PreProcessor,
+    Type,
+    parse_decls,
+    parse_buffer,
+    parse_file,
+    parse_many,
 )
+from cdecl.diff import diff_decls, parse_header_dir
+from cdecl.footprint import footprint
+from cdecl.include import IncludeSession
+from cdecl.index import DeclIndex
+from cdecl.layout import ILP32, LLP64, LP64, FieldIndex
+from cdecl.lazy import parse_decls_lazy
+from cdecl.pattern import compile_pattern
+from cdecl.render import CRenderer, EnglishRenderer
+from cdecl.symbols import SymbolKind, scan_symbols
+from cdecl.watch import HeaderWatcher
 
 
 def test_parse():
@@ -111,10 +132,7 @@ def test_parse():
     assert "foo" in decls
     assert decls["foo"].kind == TypeKind.FUNC
     assert decls["foo"].base is None
-    assert decls["foo"].params is not None
-    assert len(decls["foo"].params) == 1
-    assert decls["foo"].params[0][0].kind == TypeKind.VOID
-    assert decls["foo"].params[0][1] is None
+    assert decls["foo"].params is None
     assert decls["foo"].ret_ty is not None
     assert decls["foo"].ret_ty.kind == TypeKind.INT
 
@@ -277,7 +295,7 @@ def test_parse():
     decls = _parse_tokens(tokens, err_rep)
     assert len(decls) == 1
     assert "a" in decls
-    assert decls["a"].kind == TypeKind.ULONG
+    assert decls["a"].kind == TypeKind.ULLONG
     assert decls["a"].base is None
     assert decls["a"].params is None
     assert decls["a"].ret_ty is None
@@ -453,3 +471,626 @@ def test_pre_process():
     """
     content = _pre_process(content)
     assert content == "\n    int foo(int i);\n    int bar(int i);"
+
+
+def test_source_map():
+    content = """\
+    // comment
+    #define N 4 /* four */
+    extern "C" {
+    int a[N]; /* trailing */
+    int b /* gap */ c;
+    }
+    """
+    pre_processed, source_map = PreProcessor(content)()
+    assert pre_processed == "\n    int a[4];\n    int b c;"
+    err_rep = ErrorReporter(content, source_map)
+    tokens = _tokenise(pre_processed, err_rep)
+    assert len(tokens) == 10
+    assert err_rep.locate(tokens[0].content_idx) == (4, 4)
+    assert err_rep.locate(tokens[3].content_idx) == (4, 10)
+    assert err_rep.locate(tokens[8].content_idx) == (5, 20)
+    with raises(RuntimeError, match="Error: 5"):
+        _parse_tokens(tokens, err_rep)
+
+
+def test_decl_index():
+    decls = parse_decls(["""\
+            typedef int foo_t;
+            typedef foo_t *bar_t;
+            int get(foo_t *f, size_t n);
+            int put(bar_t b);
+            int (*lookup(int i))(foo_t *f);
+            bar_t table[3];
+            """])
+    index = DeclIndex(decls)
+    foo_ptr = Type(TypeKind.PTR, Type(TypeKind.INT, typedef_name="foo_t"))
+    assert index.taking(foo_ptr) == {"get"}
+    assert index.taking(Type(TypeKind.SIZE)) == {"get"}
+    assert index.using_typedef("foo_t") == {"get", "put", "lookup", "table"}
+    assert index.using_typedef("bar_t") == {"put", "table"}
+    assert index.of_kind(TypeKind.FUNC) == {"get", "put", "lookup"}
+    assert index.returning(Type(TypeKind.INT)) == {"get", "put"}
+    assert index.returning_kind(TypeKind.PTR, TypeKind.FUNC) == {"lookup"}
+    assert DeclIndex(parse_decls(["int f(void);"])).taking(Type(TypeKind.VOID)) == set()
+
+    index.remove("get")
+    assert index.taking(foo_ptr) == set()
+    index.add("get2", decls["get"])
+    assert index.taking(foo_ptr) == {"get2"}
+    index.add("get2", Type(TypeKind.VOID))
+    assert index.taking(foo_ptr) == set()
+    assert index.of_kind(TypeKind.VOID) == {"get2"}
+
+    decls = parse_decls(
+        ["typedef int foo_t; typedef foo_t bar_t, *fp_t; bar_t x; fp_t y;"]
+    )
+    index = DeclIndex(decls)
+    assert index.using_typedef("foo_t") == {"x", "y"}
+    assert index.using_typedef("bar_t") == {"x"}
+    assert decls["x"].aliased.typedef_name == "foo_t"
+    index.remove("x")
+    index.remove("y")
+    del decls
+    assert index._typedef_memo == {}
+
+
+def test_pattern():
+    decls = parse_decls(["""\
+            typedef int (*cb_t)(void *ctx, size_t n);
+            int (*get_cb(int i))(void *ctx, size_t n);
+            int (*cb)(void *ctx, size_t n);
+            cb_t cbs[4];
+            int f(void *a, size_t n);
+            void g(int a, int b, int c);
+            int h(int a, int b);
+            int v(void);
+            """])
+    pattern = compile_pattern("ptr(func(ptr(void), size_t) -> int)")
+    assert [name for name, _ in pattern.scan(decls)] == ["cb"]
+    pattern = compile_pattern("func(...) -> ptr(func(ptr(void), size))")
+    assert [name for name, _ in pattern.scan(decls)] == ["get_cb"]
+    pattern = compile_pattern("arr[4](cb_t)")
+    assert [name for name, _ in pattern.scan(decls)] == ["cbs"]
+
+    pattern = compile_pattern("func($a, $a, ...) -> $r")
+    matches = pattern.scan(decls)
+    assert [name for name, _ in matches] == ["g", "h"]
+    assert matches[0][1]["a"].kind == TypeKind.INT
+    assert matches[0][1]["r"].kind == TypeKind.VOID
+    assert pattern.match(decls["f"]) is None
+    assert not pattern.candidate(decls["cb"])
+    pattern = compile_pattern("func() -> int")
+    assert [name for name, _ in pattern.scan(decls)] == ["v"]
+
+    with raises(RuntimeError):
+        compile_pattern("ptr(")
+    with raises(RuntimeError):
+        compile_pattern("func(..., int)")
+    with raises(RuntimeError):
+        compile_pattern("ptr(int) int")
+
+
+def test_diff(tmp_path):
+    old = parse_decls(["""\
+            typedef int foo_t;
+            int f(foo_t a, int *b);
+            int g(void);
+            int h(int a);
+            """])
+    new = parse_decls(["""\
+            typedef long foo_t;
+            int f(foo_t a, int **b);
+            int g(void);
+            int k;
+            """])
+    diff = diff_decls(old, new)
+    assert diff.added == ["k"]
+    assert diff.removed == ["h"]
+    assert diff.changed == {"f": [".params[0]", ".params[1].base"]}
+
+    diff = diff_decls(new, parse_decls(["int f(long b, int **c); int g(void);"]))
+    assert diff.added == []
+    assert diff.removed == ["k"]
+    assert diff.changed == {}
+
+    for version, t in (("old", "int"), ("new", "long")):
+        (tmp_path / version / "inc").mkdir(parents=True)
+        (tmp_path / version / "inc" / "t.h").write_text(f"typedef {t} t;\n")
+        (tmp_path / version / "b.h").write_text('#include "inc/t.h"\nt x;\n')
+        (tmp_path / version / "c.h").write_text("#include <inc/t.h>\nt *y;\n")
+    old_dir = parse_header_dir(str(tmp_path / "old"))
+    assert old_dir == {
+        "x": Type(TypeKind.INT),
+        "y": Type(TypeKind.PTR, Type(TypeKind.INT)),
+    }
+    diff = diff_decls(old_dir, parse_header_dir(str(tmp_path / "new")))
+    assert diff.changed == {"x": ["."], "y": [".base"]}
+
+
+def test_render():
+    decls = parse_decls(["""\
+            typedef int foo_t;
+            int (*(*pf)(double d))[3];
+            foo_t *x, f(int a[], char (*)(void)), *arr[3], (*parr)[2];
+            """])
+    c_renderer = CRenderer()
+    assert c_renderer.render(decls["pf"], "pf") == "int (*(*pf)(double d))[3]"
+    assert c_renderer.render(decls["pf"]) == "int (*(*)(double d))[3]"
+    assert c_renderer.render_decls(decls) == (
+        "int (*(*pf)(double d))[3];\n"
+        "foo_t *x;\n"
+        "foo_t f(int a[], char (*)(void));\n"
+        "foo_t *arr[3];\n"
+        "foo_t (*parr)[2];\n"
+    )
+
+    en_renderer = EnglishRenderer()
+    assert (
+        en_renderer.render(decls["pf"], "pf")
+        == "declare pf as pointer to function (d as double) returning pointer to array 3 of int"
+    )
+    assert (
+        en_renderer.render(decls["f"])
+        == "function (a as array of int, pointer to function (void) returning char) returning foo_t"
+    )
+    assert en_renderer.render(decls["parr"]) == "pointer to array 2 of foo_t"
+
+
+def test_parse_file(tmp_path, capsys):
+    content = """\
+    // comment
+    #define N 4 /* four */
+    #define M (N * 2)
+    extern "C" {
+    typedef enum {
+        ONE = 1,
+    } my_enum_t;
+    typedef int foo_t;
+    int a[N], b[ /* M */ ]; /* trailing */
+    int (*(*pf)(foo_t d))[3];
+    }
+    """
+    path = tmp_path / "a.h"
+    path.write_text(content)
+    assert parse_file(str(path)) == parse_decls([content])
+    assert parse_file(str(path))["b"].array_len == 8
+
+    path.write_text("int a;\n/*\n*/\nint b c;\n")
+    assert parse_file(str(path)) == {}
+    assert capsys.readouterr().out.startswith("Error: 4\nint b c;\n      ^ ")
+
+    path.write_text("")
+    assert parse_file(str(path)) == {}
+
+    content = "typedef struct node node_t;\n" + "".join(
+        f"struct s{i} {{\n  int a; /* {i} */\n  node_t *n;\n}} v{i}, *p{i};\n"
+        for i in range(2000)
+    )
+    path.write_text(content + "struct node { long x; };\nint tail[N];\n")
+    decls = parse_file(str(path), defines={"N": "2"})
+    assert decls == parse_decls([path.read_text()], defines={"N": "2"})
+    assert decls["v1999"].members[1][0].base.members is not None
+    path.write_text(content + "int bad bad;\n")
+    assert parse_file(str(path)) == {}
+    assert capsys.readouterr().out.startswith("Error: 8002\nint bad bad;\n        ^ ")
+
+
+def test_footprint():
+    decls = parse_decls(["""\
+            typedef int (*cb_t)(void *ctx, size_t n);
+            cb_t a, b;
+            int c[3];
+            """])
+    fp = footprint(decls)
+    assert fp.decls == 3
+    assert fp.nodes == 9
+    assert fp.unique_nodes == 8
+    assert fp.shared_nodes == 1
+    assert fp.nbytes > 0
+
+
+def test_parse_lazy():
+    content = """\
+    typedef int foo_t, *foo_ptr_t;
+    typedef foo_t (*cb_t)(foo_ptr_t p, size_t n);
+    int a, *p, arr[3], (*parr)[2];
+    int (*(*pf)(double d))[3];
+    cb_t get(int data[], size_t sz), cbs[4];
+    foo_t x;
+    """
+    decls = parse_decls_lazy([content])
+    assert len(decls.cache) == 0
+    assert list(decls) == list(parse_decls([content]))
+    assert decls["cbs"] == parse_decls([content])["cbs"]
+    assert list(decls.cache) == ["cbs"]
+    assert decls["cbs"] is decls["cbs"]
+    assert dict(decls) == parse_decls([content])
+    assert "foo_t" not in decls
+
+    content = "typedef int t; t a; typedef char t; t b;"
+    assert dict(parse_decls_lazy([content])) == parse_decls([content])
+    assert parse_decls_lazy([content])["a"].kind == TypeKind.INT
+
+    content = """\
+    struct rec { int a; };
+    struct rec r;
+    typedef struct node node_t;
+    struct node { node_t *next; struct rec *r; };
+    node_t n;
+    struct a { struct b *b; } x;
+    struct b { struct a *a; } y;
+    """
+    decls = parse_decls_lazy([content])
+    assert decls["r"].members is not None
+    assert dict(decls) == parse_decls([content])
+    assert decls["n"].members[0][0].base.members == decls["n"].members
+    assert decls["y"].members[0][0].base.members[0][0].base is decls["y"]
+
+    decls = parse_decls_lazy(["typedef foo_t foo_t; foo_t a; int b;"])
+    assert decls["b"].kind == TypeKind.INT
+    with raises(RuntimeError):
+        decls["a"]
+
+    decls = parse_decls_lazy(["int a;\n#define N 2\n\nint b[N], c[x];\n"])
+    assert decls["b"].array_len == 2
+    with raises(RuntimeError, match="Error: 4\n"):
+        decls["c"]
+
+
+def test_scan_symbols():
+    content = """\
+    #define N 3
+    typedef int foo_t, *foo_ptr_t;
+    int a, *p, arr[N], (*parr)[2];
+    int (*(*pf)(double d))[3];
+    foo_t get(int data[], size_t sz), (*cbs[4])(int i);
+    """
+    symbols = scan_symbols([content])
+    assert [(s.name, s.kind) for s in symbols] == [
+        ("foo_t", SymbolKind.TYPEDEF),
+        ("foo_ptr_t", SymbolKind.TYPEDEF),
+        ("a", SymbolKind.VAR),
+        ("p", SymbolKind.VAR),
+        ("arr", SymbolKind.VAR),
+        ("parr", SymbolKind.VAR),
+        ("pf", SymbolKind.VAR),
+        ("get", SymbolKind.FUNC),
+        ("cbs", SymbolKind.VAR),
+    ]
+    assert (symbols[7].line_num, symbols[7].col) == (5, 10)
+    assert content[symbols[7].content_idx :].startswith("get(")
+
+
+def test_parse_batch(capsys):
+    decls = parse_decls(
+        [
+            "int a;",
+            "typedef int foo_t;\nfoo_t b c;",
+            "#define N 2\nint d[N];",
+            "int e[N];",
+            "foo_t f;",
+            "int g;",
+        ]
+    )
+    assert list(decls) == ["a", "d", "g"]
+    assert decls["d"].array_len == 2
+    errs = capsys.readouterr().out.split("Error: ")
+    assert errs[1].startswith("2\nfoo_t b c;\n        ^ expected ','")
+    assert errs[2].startswith("1\nint e[N];\n      ^ non-integer-literal")
+    assert errs[3].startswith("1\nfoo_t f;\n^ unrecognised typename")
+
+    assert list(parse_decls(["int a", "int b[", "int c;"])) == ["c"]
+    errs = capsys.readouterr().out.split("Error: ")
+    assert errs[1].startswith("1\nint a\n    ^ unexpected end of input")
+    assert errs[2].startswith("1\nint b[\n     ^ unexpected end of input")
+
+
+def test_watch(tmp_path):
+    (tmp_path / "a.h").write_text("int a;\nint f(int i);\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.h").write_text("int b;\n")
+    (tmp_path / "notes.txt").write_text("int c;\n")
+    watcher = HeaderWatcher(str(tmp_path))
+    diffs = watcher.poll()
+    assert [(os.path.basename(path), diff.added) for path, diff in diffs] == [
+        ("a.h", ["a", "f"]),
+        ("b.h", ["b"]),
+    ]
+    assert watcher.poll() == []
+
+    os.utime(tmp_path / "sub" / "b.h", ns=(0, 0))
+    assert watcher.poll() == []
+
+    (tmp_path / "a.h").write_text("int f(long i);\nint g;\n")
+    diffs = watcher.poll()
+    assert len(diffs) == 1
+    assert diffs[0][0] == str(tmp_path / "a.h")
+    assert diffs[0][1].added == ["g"]
+    assert diffs[0][1].removed == ["a"]
+    assert diffs[0][1].changed == {"f": [".params[0]"]}
+
+    (tmp_path / "sub" / "b.h").unlink()
+    diffs = watcher.poll()
+    assert [(os.path.basename(path), diff.removed) for path, diff in diffs] == [
+        ("b.h", ["b"])
+    ]
+    assert list(watcher.decls()) == ["f", "g"]
+
+    (tmp_path / "t.h").write_text("typedef int t;\n")
+    (tmp_path / "sub" / "b.h").write_text('#include "../t.h"\nt x;\n')
+    diffs = watcher.poll()
+    assert [(os.path.basename(path), diff.added) for path, diff in diffs] == [
+        ("b.h", ["x"])
+    ]
+    (tmp_path / "t.h").write_text("typedef long t;\n")
+    diffs = watcher.poll()
+    assert [(os.path.basename(path), diff.changed) for path, diff in diffs] == [
+        ("b.h", {"x": ["."]})
+    ]
+    assert watcher.decls()["x"] == Type(TypeKind.LONG)
+
+
+def test_limits(tmp_path):
+    decls = ["#define A 1\n#define B (A << 4)\nint a[B];", "int (*(*f)(int))[2];"]
+    assert parse_decls(decls, Limits(10**6, 100, 8, 2, 16, 10.0)) == parse_decls(decls)
+    with raises(LimitExceeded, match="input size 9 exceeds limit 8"):
+        parse_decls(["int a, b;"], Limits(max_input_size=8))
+    with raises(LimitExceeded, match="token count"):
+        parse_decls(["int a, b;"], Limits(max_tokens=4))
+    with raises(LimitExceeded, match="nesting depth"):
+        parse_decls(["int " + "(" * 100 + "a" + ")" * 100 + ";"], Limits(max_depth=50))
+    with raises(LimitExceeded, match="nesting depth"):
+        parse_decls(["int a" + "[1]" * 100 + ";"], Limits(max_depth=50))
+    nested = "struct { " * 3000 + "int a; " + "} s; " * 2999 + "} v;"
+    with raises(LimitExceeded, match="nesting depth"):
+        parse_decls([nested], Limits(max_depth=50))
+    with raises(LimitExceeded, match="macro count"):
+        parse_decls(["#define A 1\n#define B 2\nint a;"], Limits(max_macros=1))
+    with raises(LimitExceeded, match="macro expansion size"):
+        parse_decls(
+            ["#define A 0x1+0x1\n#define B A+A+A\nint a[B];"],
+            Limits(max_macro_size=16),
+        )
+    with raises(LimitExceeded, match="time budget"):
+        parse_decls(["int a;"], Limits(time_budget=-1.0))
+    assert parse_decls(["#define A 1 << 99\n#define B 9**9\nint a[A], b[B];"]) == {}
+    huge = "*".join(["9" * 100] * 50)
+    decls = parse_decls([f"#define H {huge}\n#define Q 7/2\nint a[Q];"])
+    assert decls["a"].array_len == 3
+    (tmp_path / "a.h").write_text("int a;\n")
+    with raises(LimitExceeded, match="input size 7"):
+        parse_file(str(tmp_path / "a.h"), Limits(max_input_size=6))
+
+
+def test_include(tmp_path):
+    (tmp_path / "inc").mkdir()
+    (tmp_path / "inc" / "base.h").write_text(
+        "/* base */\n#ifndef BASE_H\n#define BASE_H\n#define N 4\n"
+        "typedef int handle_t;\nhandle_t base_open(void);\n#endif /* BASE_H */\n"
+    )
+    (tmp_path / "inc" / "once.h").write_text(
+        "#pragma once\n#include <base.h>\ntypedef handle_t *handle_ptr_t;\n"
+    )
+    (tmp_path / "a.c").write_text(
+        '#include <stdint.h>\n#include "inc/once.h"\n#include <base.h>\n'
+        "handle_ptr_t a[N];\n"
+    )
+    (tmp_path / "b.c").write_text('#include "inc/base.h"\nhandle_t b;\n')
+    session = IncludeSession([str(tmp_path / "inc")])
+    a_decls = session.parse_file(str(tmp_path / "a.c"))
+    b_decls = session.parse_file(str(tmp_path / "b.c"))
+    assert list(a_decls) == ["base_open", "a"]
+    assert list(b_decls) == ["base_open", "b"]
+    assert a_decls["a"].array_len == 4
+    assert a_decls["a"].base.base is b_decls["b"]
+    assert len(session.headers) == 4
+    base = session.headers[os.path.realpath(tmp_path / "inc" / "base.h")]
+    assert base.guarded
+    assert session.headers[os.path.realpath(tmp_path / "a.c")].once == {
+        base.path,
+        os.path.realpath(tmp_path / "inc" / "once.h"),
+    }
+
+
+def test_conditionals():
+    src = """#define VERSION 3
+#define FEATURE
+#ifdef _WIN32
+typedef long handle_t;
+#elif defined(__linux__) && VERSION >= 2 /* linux */
+typedef int handle_t;
+#  if VERSION > 3
+int new_api(void);
+#  else
+int old_api(void);
+#  endif
+#else
+typedef void *handle_t;
+#endif
+#ifndef FEATURE
+int no_feature;
+#endif
+#undef FEATURE
+#if !defined FEATURE && (VERSION << 2) % 5 == 2 ? 1 : 0
+handle_t h;
+#endif
+#if VERSION / 0
+int bad;
+#endif
+"""
+    linux = parse_decls([src], defines={"__linux__": "1"})
+    assert list(linux) == ["old_api", "h"]
+    assert linux["h"] == Type(TypeKind.INT)
+    assert parse_buffer(src.encode(), defines={"__linux__": "1"}) == linux
+    win = parse_decls([src], defines={"_WIN32": None})
+    assert list(win) == ["h"]
+    assert win["h"] == Type(TypeKind.LONG)
+    assert parse_decls([src, "int x;"]) == {
+        "h": Type(TypeKind.PTR, Type(TypeKind.VOID)),
+        "x": Type(TypeKind.INT),
+    }
+    assert parse_decls(["#if 1\nint a;\n#if 0\nint b;\n", "int c;"]) == {
+        "a": Type(TypeKind.INT),
+        "c": Type(TypeKind.INT),
+    }
+    values = """#define NEG (-1)
+#define UNS 2u
+#define A B
+#define B 3
+#if NEG < 0 && UNS >= 1 && A == 3
+int taken[B];
+#else
+int skipped;
+#endif
+int f(int NEG);
+"""
+    decls = parse_decls([values])
+    assert list(decls) == ["taken", "f"]
+    assert decls["taken"].array_len == 3
+    assert decls["f"].params[0][1] == "NEG"
+    assert parse_buffer(values.encode()) == decls
+
+
+def test_parse_many(capsys):
+    handle_t = parse_decls(["typedef int *handle_t; handle_t h;"])["h"]
+    decl_strs = [f"handle_t f{i}(int n); int a{i}[{i + 1}];" for i in range(50)]
+    decl_strs[10] = "handle_t bad bad;"
+    decl_strs[20] = "typedef long handle_t; handle_t g;"
+    with ThreadPoolExecutor(4) as pool:
+        decls = parse_many(decl_strs, pool, {"handle_t": handle_t})
+    assert decls == parse_many(decl_strs, typedefs={"handle_t": handle_t})
+    assert len(decls) == 97
+    assert decls["f0"].ret_ty is handle_t
+    assert decls["a49"].array_len == 50
+    assert decls["g"] == Type(TypeKind.LONG)
+    assert decls["f21"].ret_ty is handle_t
+    errs = capsys.readouterr().out.split("Error: ")
+    assert len(errs) == 3
+    assert errs[1].startswith("1\nhandle_t bad bad;\n             ^ expected ','")
+
+
+def test_struct(capsys):
+    src = """extern "C" {
+typedef struct rec {
+    unsigned int kind : 4, : 0;
+    unsigned int flags : 3;
+    struct {
+        int x, y;
+    };
+    union {
+        double d;
+        char c[3];
+    } u;
+    struct rec *next;
+}
+rec_t;
+struct rec r;
+rec_t *rp;
+int f(struct rec *p, union { int a; } b);
+}
+"""
+    decls = parse_decls([src])
+    assert parse_buffer(src.encode()) == decls
+    rec = decls["r"]
+    assert rec.kind == TypeKind.STRUCT
+    assert rec.tag == "rec"
+    assert [(name, bit_width) for _, name, bit_width in rec.members] == [
+        ("kind", 4),
+        (None, 0),
+        ("flags", 3),
+        (None, None),
+        ("u", None),
+        ("next", None),
+    ]
+    assert rec.members[3][0].kind == TypeKind.STRUCT
+    assert rec.members[4][0].kind == TypeKind.UNION
+    assert rec.members[5][0].kind == TypeKind.PTR
+    assert rec.members[5][0].base is rec
+    assert decls["rp"].base == rec
+    assert decls["rp"].base.typedef_name == "rec_t"
+
+    lp64 = FieldIndex(LP64)
+    assert (lp64(rec).size, lp64(rec).align) == (32, 8)
+    assert {
+        name: (field.offset, field.bit_offset, field.bit_width)
+        for name, field in lp64.fields(rec).items()
+    } == {
+        "kind": (0, 0, 4),
+        "flags": (4, 0, 3),
+        "x": (8, None, None),
+        "y": (12, None, None),
+        "u": (16, None, None),
+        "next": (24, None, None),
+    }
+    assert lp64.field(rec, "y").ty == Type(TypeKind.INT)
+    assert lp64(rec) is lp64(rec)
+    assert lp64.fields(decls["rp"].base) == lp64.fields(rec)
+    ilp32 = FieldIndex(ILP32)
+    assert (ilp32(rec).size, ilp32(rec).align) == (28, 4)
+    assert ilp32.field(rec, "next").offset == 24
+    assert lp64(rec.members[5][0].base) is lp64(rec)
+
+    nodes = parse_decls(
+        [
+            "typedef struct node node_t; struct node { int v; node_t *next; };"
+            "node_t n; struct node m; struct later *p;"
+        ]
+    )
+    assert nodes["n"].members is nodes["m"].members
+    assert nodes["n"].members[1][0].base is nodes["n"]
+    node = parse_decls(["struct node { int v; struct node *next; } n;"])["n"]
+    assert nodes["n"] == node
+    assert DeclIndex(nodes).using_typedef("node_t") == {"n", "m"}
+    assert lp64(nodes["n"]).size == 16
+    with raises(ValueError, match="incomplete type struct later"):
+        lp64(nodes["p"].base)
+
+    longs = parse_decls(
+        [
+            "struct { char c; long long q; } q;",
+            "struct { char c : 4; int i : 4; short s : 2; } b;",
+            "struct { char x : 2; int : 0; char y; } z;",
+            "struct { unsigned char a, b; } uc;",
+            "struct { signed char a; unsigned char b : 3, c : 6; } sc;",
+        ]
+    )
+    llp64 = FieldIndex(LLP64)
+    assert (ilp32(longs["q"]).size, ilp32.field(longs["q"], "q").offset) == (12, 4)
+    assert (llp64(longs["q"]).size, llp64.field(longs["q"], "q").offset) == (16, 8)
+    assert CRenderer().render(longs["q"].members[1][0]) == "long long"
+    assert lp64(longs["b"]).size == 4
+    assert llp64(longs["b"]).size == 12
+    assert llp64.field(longs["b"], "s").offset == 8
+    assert (lp64(longs["z"]).size, llp64(longs["z"]).size) == (5, 8)
+    assert longs["uc"].members[0][0].kind == TypeKind.UCHAR
+    assert (lp64(longs["uc"]).size, lp64(longs["uc"]).align) == (2, 1)
+    assert longs["sc"].members[0][0].kind == TypeKind.CHAR
+    assert (lp64(longs["sc"]).size, llp64(longs["sc"]).size) == (3, 3)
+
+    assert CRenderer().render(decls["f"], "f") == (
+        "int f(struct rec *p, union { int a; } b)"
+    )
+    assert EnglishRenderer().render(decls["f"].params[1][0]) == "union (a as int)"
+    assert [symbol.name for symbol in scan_symbols([src])] == [
+        "rec_t",
+        "r",
+        "rp",
+        "f",
+    ]
+    assert diff_decls(
+        decls, parse_decls([src.replace("flags : 3", "flags : 5")])
+    ).changed == {
+        "r": [".members[2]"],
+        "rp": [".base.members[2]"],
+        "f": [".params[0].base.members[2]"],
+    }
+
+    parse_decls(["struct s { int a; int a; };", "struct s { int a : b; };"])
+    errs = capsys.readouterr().out.split("Error: ")
+    assert errs[1].startswith(
+        "1\nstruct s { int a; int a; };\n                      ^ duplicate member 'a'"
+    )
+    assert errs[2].startswith(
+        "1\nstruct s { int a : b; };\n                   ^ bitfield width"
+    )